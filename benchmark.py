@@ -0,0 +1,312 @@
+"""script benchmark.py measures the performance of the tableux algorithm implementation in program tableux.py.
+
+    python benchmark.py parse [--megabytes 1 4] [--repeat 3]
+        parse throughput of tableux_representation on generated multi-megabyte formulas
+
+    python benchmark.py run [--n 6] [--sets series-1 ...] [--warmup 1] [--repeat 5] [--timeout 60] [--output results.json]
+        wall time, peak memory and tableau node counts of tableux_method on the formula series and test formula sets,
+        written to a JSON or CSV file (by extension) and printed as a table. with --simplify the rows also have the formula size
+        before and after simplification, size_before and size_after
+
+    python benchmark.py compare old.json new.json [--threshold 0.2] [--min-delta 0.005]
+        flags instances that got slower, timed out or changed their verdict between two result files, exit status 1 if any
+
+the results are plotted by performance-plot.py.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import tableux
+
+
+### parse throughput
+
+def parse_inputs(megabytes):
+    """generated formulas of roughly the given size in megabytes, keyed by a short description.
+        gadgets     conjunction of generate_formula q_i gadgets, many distinct atoms
+        series-1    last formula of generate_formula_series_1, repeated gadgets under growing boxes
+        nested      a boxed atom under one negation per 5 bytes, nesting depth far beyond the recursion limit
+        native      the gadgets formula written with | instead of not(not(a)&not(b)), with atoms r_i so that its nodes are new
+    """
+    size = int(megabytes * 1e6)
+    # atom names grow with the number of gadgets, correct the first estimate once
+    n = size // (len(tableux.generate_formula(1)) - 1)
+    n = n * size // len(tableux.generate_formula(n))
+    inputs = {'gadgets': tableux.generate_formula(n)}
+    inputs['native'] = 'T&' + '&'.join(['((not(r{0})|_r{0})&(r{0}|_not(r{0})))'.format(i) for i in range(1, n + 1)])
+
+    # the series-1 formula for n contains the gadgets for 1..n
+    gadget = len(tableux.generate_formula(100)) / 100
+    n = int((2 * size / gadget) ** 0.5)
+    inputs['series-1'] = tableux.generate_formula_series_1(n)[-1]
+
+    depth = size // 5
+    inputs['nested'] = 'not(' * depth + '_p' + ')' * depth
+    return inputs
+
+
+def parse_throughput(megabytes, repeat=3):
+    """times tableux_representation on parse_inputs(megabytes). the first parse creates the formula nodes (cold),
+    the repetitions bypass the parse cache and only look the nodes up in the intern table (warm).
+    output: list of (description, length in bytes, cold time, best warm time)"""
+    parse = tableux.tableux_representation.__wrapped__
+    results = []
+    for description, phi in parse_inputs(megabytes).items():
+        start = time.perf_counter()
+        parse(phi)
+        cold = time.perf_counter() - start
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(phi)
+            warm.append(time.perf_counter() - start)
+        results.append((description, len(phi), cold, min(warm)))
+    return results
+
+
+def print_parse_throughput(results):
+    print('{:<10} {:>10} {:>10} {:>10} {:>10}'.format('formula', 'MB', 'cold [s]', 'warm [s]', 'MB/s'))
+    for description, length, cold, warm in results:
+        megabytes = length / 1e6
+        print('{:<10} {:>10.2f} {:>10.3f} {:>10.3f} {:>10.2f}'.format(description, megabytes, cold, warm, megabytes / cold))
+
+
+### instance sets
+
+FORMULA_SETS = {
+    'series-1': tableux.generate_formula_series_1,
+    'series-2': tableux.generate_formula_series_2,
+    'series-3': tableux.generate_formula_series_3,
+    'series-4': tableux.generate_formula_series_4,
+    'test': lambda n: tableux.test_formulae,
+    'test-2': lambda n: tableux.test_formulae_2,
+    'modal': lambda n: tableux.modal_test_formulae,
+    'modal-2': lambda n: tableux.modal_test_formulae_2,
+}
+"""formula sets by name, each a function of n returning the list of formulas. the series have n+1 formulas of growing size,
+the test formula sets do not depend on n."""
+
+
+### measurement
+
+def solve(phi, options):
+    """one measured run: parses phi and solves it with a fresh world cache, so repetitions do not hit the results of earlier runs.
+    formula nodes stay interned between runs, they are created by the warmup.
+    output: (satisfiable, TableuxStats of the run)"""
+    tableux.tableux_representation.cache_clear()
+    stats = tableux.TableuxStats()
+    satisfiable = tableux.tableux_method(tableux.tableux_representation(phi), cache=tableux.SatCache(), stats=stats, **options)
+    return satisfiable, stats
+
+
+def measure(connection, phi, warmup, repeat, options):
+    """runs in a child process and sends one message per finished run through connection, so the parent can time out each run:
+        ('warmup',)
+        ('run', wall time, satisfiable, stats dict)
+        ('memory', peak traced memory in bytes)     one more run under tracemalloc, which slows the run down
+        ('error', exception name, message)
+    """
+    try:
+        for _ in range(warmup):
+            solve(phi, options)
+            connection.send(('warmup',))
+        for _ in range(repeat):
+            start = time.perf_counter()
+            satisfiable, stats = solve(phi, options)
+            connection.send(('run', time.perf_counter() - start, satisfiable, stats.as_dict()))
+        tracemalloc.start()
+        solve(phi, options)
+        connection.send(('memory', tracemalloc.get_traced_memory()[1]))
+        tracemalloc.stop()
+    except Exception as error:
+        connection.send(('error', type(error).__name__, str(error)))
+    finally:
+        connection.close()
+
+
+def run_instance(phi, warmup=1, repeat=5, timeout=60, options={}):
+    """measures one formula in a child process, which is killed if a single run takes longer than timeout seconds.
+    output: result dict
+        status      'ok', 'timeout' or 'error'
+        satisfiable verdict, None if no run finished
+        time        median wall time of the repetitions in seconds, times all of them
+        peak_memory peak memory allocated by one run in bytes
+        the counters of TableuxStats of the last run, worlds and branches_opened are the nodes of the tableau
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=measure, args=(sender, phi, warmup, repeat, options), daemon=True)
+    process.start()
+    sender.close()
+    result = {'status': 'ok', 'satisfiable': None, 'time': None, 'times': [], 'peak_memory': None}
+    for _ in range(warmup + repeat + 1):
+        if not receiver.poll(timeout):
+            result['status'] = 'timeout'
+            process.kill()
+            break
+        try:
+            message = receiver.recv()
+        except EOFError:
+            result.update(status='error', error='child process exited with code ' + str(process.exitcode))
+            break
+        if message[0] == 'run':
+            result['times'].append(message[1])
+            result['satisfiable'] = message[2]
+            result.update(message[3])
+        elif message[0] == 'memory':
+            result['peak_memory'] = message[1]
+        elif message[0] == 'error':
+            result.update(status='error', error=message[1] + ': ' + message[2])
+            break
+    process.join()
+    receiver.close()
+    if result['times']:
+        result['time'] = statistics.median(result['times'])
+    return result
+
+
+def run_benchmark(sets, n=6, warmup=1, repeat=5, timeout=60, options={}, progress=None):
+    """measures every formula of the formula sets named sets with run_instance. once an instance of a set times out, the following,
+    larger instances of the set are recorded as 'skipped'.
+    progress is an optional callable that is given each result as it is finished.
+    output: {'meta': settings and platform, 'results': list of result dicts with set, index (1-based) and length of the formula}"""
+    meta = {'n': n, 'warmup': warmup, 'repeat': repeat, 'timeout': timeout, 'options': options, 'python': platform.python_version(),
+            'platform': platform.platform(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    results = []
+    for name in sets:
+        timed_out = False
+        for index, phi in enumerate(FORMULA_SETS[name](n), 1):
+            if timed_out:
+                result = {'status': 'skipped', 'satisfiable': None, 'time': None, 'times': [], 'peak_memory': None}
+            else:
+                result = run_instance(phi, warmup, repeat, timeout, options)
+                timed_out = result['status'] == 'timeout'
+            result = dict({'set': name, 'index': index, 'length': len(phi)}, **result)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {'meta': meta, 'results': results}
+
+
+### result files
+
+CSV_FIELDS = ['set', 'index', 'length', 'status', 'satisfiable', 'time', 'peak_memory'] + [
+    name for name in tableux.TableuxStats.__slots__ if not name.startswith('world_time')]
+
+
+def save_results(benchmark, path):
+    """writes the output of run_benchmark to path, as CSV with the columns CSV_FIELDS if path ends with .csv, otherwise as JSON."""
+    with open(path, 'w', newline='') as file:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(file, CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(benchmark['results'])
+        else:
+            json.dump(benchmark, file, indent=1)
+
+
+def load_results(path):
+    """reads a file written by save_results. output: list of result dicts, CSV values converted back to numbers and booleans."""
+    with open(path, newline='') as file:
+        if not path.endswith('.csv'):
+            return json.load(file)['results']
+        results = list(csv.DictReader(file))
+    for result in results:
+        for field, value in result.items():
+            if value == '':
+                result[field] = None
+            elif value in ('True', 'False'):
+                result[field] = value == 'True'
+            elif field not in ('set', 'status', 'stopped'):
+                result[field] = float(value) if field == 'time' else int(value)
+    return results
+
+
+def compare_results(old, new, threshold=0.2, min_delta=0.005):
+    """instances of two result lists that regressed, matched by set and index:
+    slower by more than the fraction threshold and by more than min_delta seconds, no longer 'ok', or with a different verdict.
+    output: list of (set, index, description)"""
+    old = {(result['set'], result['index']): result for result in old}
+    regressions = []
+    for result in new:
+        key = (result['set'], result['index'])
+        if key not in old:
+            continue
+        before = old[key]
+        if before['status'] == 'ok' and result['status'] != 'ok':
+            regressions.append(key + (result['status'] + ', was ' + format_time(before['time']),))
+        elif before['status'] == 'ok' and result['satisfiable'] != before['satisfiable']:
+            regressions.append(key + ('verdict ' + str(result['satisfiable']) + ', was ' + str(before['satisfiable']),))
+        elif before['status'] == 'ok' and result['time'] > before['time'] * (1 + threshold) and \
+                result['time'] - before['time'] > min_delta:
+            regressions.append(key + (format_time(result['time']) + ', was ' + format_time(before['time']) +
+                                      ' ({:+.0%})'.format(result['time'] / before['time'] - 1),))
+    return regressions
+
+
+def format_time(seconds):
+    return '-' if seconds is None else '{:.4f} s'.format(seconds)
+
+
+def print_result(result):
+    memory = '-' if result['peak_memory'] is None else '{:.1f} kB'.format(result['peak_memory'] / 1e3)
+    size = '-' if not result.get('size_before') else str(result['size_before']) + '>' + str(result['size_after'])
+    print('{:<9} {:>4} {:>10} {:>8} {:>6} {:>12} {:>12} {:>9} {:>9} {:>15}'.format(
+        result['set'], result['index'], result['length'], result['status'], str(result['satisfiable']), format_time(result['time']),
+        memory, str(result.get('worlds', '-')), str(result.get('branches_opened', '-')), size), flush=True)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parse_command = commands.add_parser('parse', help='parse throughput on generated multi-megabyte formulas')
+    parse_command.add_argument('--megabytes', type=float, nargs='+', default=[1, 4])
+    parse_command.add_argument('--repeat', type=int, default=3)
+
+    run_command = commands.add_parser('run', help='time the formula series and test formula sets')
+    run_command.add_argument('--n', type=int, default=6, help='last formula of the series, the series have n+1 formulas')
+    run_command.add_argument('--sets', nargs='+', choices=list(FORMULA_SETS), default=list(FORMULA_SETS))
+    run_command.add_argument('--warmup', type=int, default=1)
+    run_command.add_argument('--repeat', type=int, default=5)
+    run_command.add_argument('--timeout', type=float, default=60, help='seconds per run of one instance')
+    run_command.add_argument('--heuristic', choices=tableux.BRANCHING_HEURISTICS, default='order')
+    run_command.add_argument('--simplify', action='store_true', help='simplify the formulas before the tableux method')
+    run_command.add_argument('--engine', choices=tableux.ENGINES, default='tableux')
+    run_command.add_argument('--semantic', action='store_true', help='semantic branching')
+    run_command.add_argument('--output', help='result file, .csv for CSV, JSON otherwise')
+
+    compare_command = commands.add_parser('compare', help='flag regressions between two result files')
+    compare_command.add_argument('old')
+    compare_command.add_argument('new')
+    compare_command.add_argument('--threshold', type=float, default=0.2, help='relative slowdown that counts as a regression')
+    compare_command.add_argument('--min-delta', type=float, default=0.005, help='absolute slowdown in seconds below which it does not')
+
+    args = parser.parse_args()
+
+    if args.command == 'parse':
+        for megabytes in args.megabytes:
+            print_parse_throughput(parse_throughput(megabytes, args.repeat))
+
+    elif args.command == 'run':
+        print('{:<9} {:>4} {:>10} {:>8} {:>6} {:>12} {:>12} {:>9} {:>9} {:>15}'.format(
+            'set', 'i', 'length', 'status', 'sat', 'time', 'memory', 'worlds', 'branches', 'simplified size'))
+        options = {'heuristic': args.heuristic, 'preprocess': args.simplify, 'engine': args.engine, 'semantic': args.semantic}
+        benchmark = run_benchmark(args.sets, args.n, args.warmup, args.repeat, args.timeout, options, print_result)
+        if args.output is not None:
+            save_results(benchmark, args.output)
+
+    elif args.command == 'compare':
+        regressions = compare_results(load_results(args.old), load_results(args.new), args.threshold, args.min_delta)
+        for name, index, description in regressions:
+            print('{:<9} {:>4}  {}'.format(name, index, description))
+        print(len(regressions), 'regressions')
+        sys.exit(1 if regressions else 0)
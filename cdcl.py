@@ -0,0 +1,255 @@
+"""module cdcl.py is a small conflict-driven clause learning SAT solver in pure python, the propositional core of the KSAT engine of
+program tableux.py. it is incremental: clauses can be added between calls of solve, e.g. to block a model.
+
+    literals are non-zero ints, v for variable v and -v for its negation. variables are numbered from 1 by new_var.
+"""
+
+import heapq
+
+
+def luby(i):
+    """i-th element (from 1) of the luby sequence 1 1 2 1 1 2 4 1 1 2 ..., the restart intervals."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class CDCL:
+    """CDCL solver with two watched literals per clause, first-UIP clause learning, non-chronological backjumping, VSIDS variable
+    activities with phase saving and luby restarts.
+        value       maps the assigned literals and their negations to True resp. False
+        level       decision level of each assigned variable, reason the clause that implied it, None for decisions
+        trail       assigned literals in order, trail_lim the trail lengths at the start of each decision level
+        watches     maps a literal to the clauses watching it. the first two literals of a clause are watched, the clause is visited
+                    when one of them becomes false
+        ok          False once the clauses are unsatisfiable at level 0
+    counters: decisions, conflicts, propagations (implied literals), learned (learned clauses).
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+        self.learnts = []
+        self.value = {}
+        self.level = {}
+        self.reason = {}
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.watches = {}
+        self.activity = {}
+        self.phase = {}
+        self.heap = []
+        self.var_inc = 1.0
+        self.ok = True
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+        self.learned = 0
+
+    def new_var(self):
+        self.variables += 1
+        v = self.variables
+        self.watches[v] = []
+        self.watches[-v] = []
+        self.activity[v] = 0.0
+        self.phase[v] = False
+        heapq.heappush(self.heap, (0.0, v))
+        return v
+
+    def add_clause(self, literals):
+        """adds the clause, a list of literals, at decision level 0. returns False if the clauses became unsatisfiable."""
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        clause = []
+        for lit in literals:
+            value = self.value.get(lit)
+            if value is True or -lit in clause:
+                # satisfied at level 0 or a tautology
+                return True
+            if value is None and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.clauses.append(clause)
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+        return self.ok
+
+    def model(self):
+        """the satisfying assignment found by the last successful solve, maps the variables to bool."""
+        return {v: self.value[v] for v in range(1, self.variables + 1)}
+
+    ### search
+
+    def assign(self, lit, reason):
+        self.value[lit] = True
+        self.value[-lit] = False
+        v = lit if lit > 0 else -lit
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def cancel_until(self, level):
+        """undoes the assignments of the decision levels above level."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        value = self.value
+        for lit in self.trail[start:]:
+            v = lit if lit > 0 else -lit
+            del value[lit]
+            del value[-lit]
+            self.phase[v] = lit > 0
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def propagate(self):
+        """unit propagation of the literals on the trail from qhead. returns the conflicting clause or None."""
+        value = self.value
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            watching = watches[false_lit]
+            kept = []
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+                # the false literal goes to position 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if value.get(first) is True:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if value.get(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value.get(first) is False:
+                        kept.extend(watching[i:])
+                        watches[false_lit] = kept
+                        return clause
+                    self.assign(first, clause)
+                    self.propagations += 1
+            watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """first-UIP learned clause of the conflicting clause, its asserting literal first and a literal of the backjump level second.
+        output: (learned clause, backjump level)"""
+        level = self.level
+        current = len(self.trail_lim)
+        seen = set()
+        learned = [0]
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = q if q > 0 else -q
+                if v not in seen and level[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if level[v] == current:
+                        counter += 1
+                    else:
+                        learned.append(q)
+            while (self.trail[index] if self.trail[index] > 0 else -self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reason[lit if lit > 0 else -lit]
+        learned[0] = -lit
+        if len(learned) == 1:
+            return learned, 0
+        # the literal of the highest level below the current one is watched second
+        best = max(range(1, len(learned)), key=lambda k: level[abs(learned[k])])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, level[abs(learned[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            for u in self.activity:
+                self.activity[u] *= 1e-100
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in self.activity if self.value.get(u) is None]
+            heapq.heapify(self.heap)
+        elif self.value.get(v) is None:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def decide(self):
+        """unassigned variable of the highest activity with its saved phase, None if all variables are assigned."""
+        heap = self.heap
+        while heap:
+            activity, v = heapq.heappop(heap)
+            if self.value.get(v) is None and -activity == self.activity[v]:
+                return v if self.phase[v] else -v
+        for v in range(1, self.variables + 1):
+            if self.value.get(v) is None:
+                return v if self.phase[v] else -v
+        return None
+
+    def solve(self, check=None):
+        """satisfiability of the clauses. the model stays assigned until the next add_clause. check is an optional callable that is
+        called every 256 decisions and may raise to abort the search."""
+        if not self.ok:
+            return False
+        restarts = 1
+        budget = 100 * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.learnts.append(learned)
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                    self.assign(learned[0], learned)
+                self.learned += 1
+                self.var_inc /= 0.95
+                budget -= 1
+                if budget <= 0:
+                    restarts += 1
+                    budget = 100 * luby(restarts)
+                    self.cancel_until(0)
+            else:
+                lit = self.decide()
+                if lit is None:
+                    return True
+                self.decisions += 1
+                if check is not None and self.decisions & 255 == 0:
+                    check()
+                self.trail_lim.append(len(self.trail))
+                self.assign(lit, None)
@@ -0,0 +1,104 @@
+"""script load-generator.py measures the throughput and latency of a running tableux_server.py with the formula series of tableux.py.
+
+    python tableux_server.py serve --socket /tmp/tableux.sock &
+    python load-generator.py (--socket PATH | --port N) [--n 6] [--sets series-1 ...] [--requests 1000] [--connections 8]
+
+every connection is one thread with a TableuxClient that keeps up to --pipeline requests in flight. the formulas of the series are sent
+round robin, so after the first round the caches of the workers are warm. latency is measured by the client, from sending a request
+to receiving its reply.
+"""
+
+import argparse
+import threading
+import time
+
+import tableux
+from tableux_server import TableuxClient, percentile
+
+
+SERIES = {'series-' + str(k): getattr(tableux, 'generate_formula_series_' + str(k)) for k in range(1, 5)}
+
+
+def connection(address, formulas, offset, count, pipeline, options, latencies, verdicts):
+    """sends count requests on one connection, the formulas from offset on round robin, and records the latencies and verdicts."""
+    path, host, port = address
+    sent = {}
+    with TableuxClient(path, host, port) as client:
+        received = 0
+        for k in range(count + pipeline):
+            if k < count:
+                sent[k] = time.perf_counter()
+                client.send({'id': k, 'formula': formulas[(offset + k) % len(formulas)], **options})
+            if k >= pipeline - 1 and received < count:
+                result = client.receive()
+                latencies.append(time.perf_counter() - sent.pop(result['id']))
+                verdict = 'error' if 'error' in result else result['satisfiable']
+                verdicts[verdict] = verdicts.get(verdict, 0) + 1
+                received += 1
+
+
+def run_load(address, formulas, requests=1000, connections=8, pipeline=1, options={}):
+    """runs the load on connections threads.
+    output: (seconds of wall time, sorted latencies in seconds, verdict counts keyed by True, False, None for unknown and 'error')"""
+    latencies = []
+    verdicts = [{} for _ in range(connections)]
+    threads = []
+    for k in range(connections):
+        count = requests // connections + (k < requests % connections)
+        offset = k * len(formulas) // connections
+        threads.append(threading.Thread(target=connection, args=(address, formulas, offset, count, pipeline, options, latencies,
+                                                                  verdicts[k])))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = {}
+    for counts in verdicts:
+        for verdict, count in counts.items():
+            total[verdict] = total.get(verdict, 0) + count
+    return elapsed, sorted(latencies), total
+
+
+def format_ms(seconds):
+    return '{:.2f}ms'.format(seconds * 1000)
+
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='throughput and latency percentiles of a running tableux_server.py.')
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument('--socket', help='path of the Unix domain socket of the server')
+    address.add_argument('--port', type=int, help='TCP port of the server')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host, localhost by default')
+    parser.add_argument('--n', type=int, default=6, help='length of each formula series')
+    parser.add_argument('--sets', nargs='+', choices=sorted(SERIES), default=sorted(SERIES))
+    parser.add_argument('--requests', type=int, default=1000, help='requests in total')
+    parser.add_argument('--connections', type=int, default=8, help='concurrent connections')
+    parser.add_argument('--pipeline', type=int, default=1, help='requests in flight per connection')
+    parser.add_argument('--warmup', type=int, default=0, help='requests sent before the measurement, e.g. to warm the caches')
+    parser.add_argument('--timeout', type=float, help='seconds per request, the default of the server if not given')
+    args = parser.parse_args()
+
+    address = (args.socket, args.host, args.port)
+    formulas = [phi for name in args.sets for phi in SERIES[name](args.n)]
+    options = {} if args.timeout is None else {'timeout': args.timeout}
+    if args.warmup:
+        run_load(address, formulas, args.warmup, args.connections, args.pipeline, options)
+    elapsed, latencies, verdicts = run_load(address, formulas, args.requests, args.connections, args.pipeline, options)
+
+    print('requests    ', len(latencies), 'on', args.connections, 'connections,', len(formulas), 'distinct formulas')
+    print('verdicts    ', 'sat', verdicts.get(True, 0), 'unsat', verdicts.get(False, 0), 'unknown', verdicts.get(None, 0),
+          'error', verdicts.get('error', 0))
+    print('throughput  ', '{:.1f} requests/s'.format(len(latencies) / elapsed))
+    if latencies:
+        print('latency     ', 'mean', format_ms(sum(latencies) / len(latencies)),
+              *('p{} {}'.format(q, format_ms(percentile(latencies, q))) for q in (50, 90, 99)), 'max', format_ms(latencies[-1]))
+    with TableuxClient(*address) as client:
+        stats = client.stats()
+    for pid, caches in sorted(stats['caches'].items()):
+        world, parse = caches['world_cache'], caches['parse_cache']
+        print('worker', pid, 'world cache', world['hits'], 'hits', world['misses'], 'misses,', 'parse cache', parse['hits'], 'hits',
+              parse['misses'], 'misses')
@@ -1,57 +1,38 @@
 """script performance-plot.py uses the matplotlib.pyplot module to plot the running times of the tableux algorithm implementation
-in program tableux.py for four fourmula series."""
+in program tableux.py for four fourmula series, from a result file of benchmark.py.
 
-import matplotlib.pyplot as plt
+    python benchmark.py run --output results.json
+    python performance-plot.py results.json [--prefix performance-plot]
+"""
+
+import argparse
 
-# run with n = 5
+import matplotlib.pyplot as plt
 
-n5 = [['0.000', '0.001', '0.005', '0.068', '1.136', '19.957'], 
-      ['0.000', '0.000', '0.001', '0.001', '0.002', '0.003'], 
-      ['0.000', '0.000', '0.001', '0.001', '0.004', '0.012'], 
-      ['0.000', '0.000', '0.001', '0.003', '0.011', '0.047']]
+from benchmark import load_results
 
-# run with n = 6
 
-n6 = [['0.000', '0.001', '0.005', '0.067', '1.139', '21.132', '348.168'], 
-      ['0.000', '0.000', '0.001', '0.001', '0.002', '0.003', '0.005'], 
-      ['0.000', '0.000', '0.000', '0.001', '0.003', '0.011', '0.047'],
-      ['0.000', '0.000', '0.001', '0.002', '0.009', '0.040', '0.176']]
+parser = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+parser.add_argument('results', help='result file of benchmark.py run, JSON or CSV')
+parser.add_argument('--prefix', default='performance-plot', help='the plots are saved as <prefix>-linear.png and <prefix>-log.png')
+args = parser.parse_args()
 
-n6 = [[float(num) for num in series] for series in n6]
+# instances that timed out or were skipped have no time and are left out
+ou = [[(result['index'], result['time']) for result in load_results(args.results)
+       if result['set'] == 'series-' + str(k) and result['time'] is not None] for k in range(1, 5)]
+styles = ['g^', 'ko', 'bs', 'r+']
 
 ### plot
 
-ou = n6
-n = 6
-
-series = range(1, n+2)
-
-# linear
-plt.figure()
-plt.plot(series, ou[0], 'g^', label='series 1')
-plt.plot(series, ou[1], 'ko', label='series 2')
-plt.plot(series, ou[2], 'bs', label='series 3')
-plt.plot(series, ou[3], 'r+', label='series 4')
-#plt.show()
-plt.yscale('linear')
-plt.xlabel('formula in series')
-plt.ylabel('performance measure [s]')
-plt.title("Tableux formula series (linear scale)")
-plt.legend()
-plt.savefig(fname='performance-plot-linear.png')
-
-
-# log 
-plt.figure()
-plt.plot(series, ou[0], 'g^', label='series 1')
-plt.plot(series, ou[1], 'ko', label='series 2')
-plt.plot(series, ou[2], 'bs', label='series 3')
-plt.plot(series, ou[3], 'r+', label='series 4')
-#plt.show()
-plt.yscale('log')
-plt.ylim(bottom=-1)
-plt.xlabel('formula in series')
-plt.ylabel('performance measure [s]')
-plt.title("Tableux formula series (log scale)")
-plt.legend()
-plt.savefig(fname='performance-plot-log.png')
\ No newline at end of file
+for scale in ('linear', 'log'):
+    plt.figure()
+    for k, series in enumerate(ou):
+        if series:
+            plt.plot([index for index, _ in series], [time for _, time in series], styles[k], label='series ' + str(k + 1))
+    #plt.show()
+    plt.yscale(scale)
+    plt.xlabel('formula in series')
+    plt.ylabel('performance measure [s]')
+    plt.title("Tableux formula series ({} scale)".format(scale))
+    plt.legend()
+    plt.savefig(fname=args.prefix + '-' + scale + '.png')
@@ -1,7 +1,20 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
 import re
-from functools import reduce
-#import cProfile, pstats, io
-#from pstats import SortKey
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from hashlib import blake2b
+
+from cdcl import CDCL
 
 
 
@@ -14,399 +27,2457 @@ def input_formula():
                         "() for parentheses (precedence): \n"
                         "not()  not operator (negation), \n"
                         "& and operator (conjunction), \n"
+                        "| or operator (disjunction), \n"
+                        "-> implication, \n"
                         "_ box operator (possibility), \n"
+                        "<> diamond operator, \n"
                         "phi = "
                         )
                     )
     return formula_phi
 
+### formula DAG
+
+class Formula:
+    """node of the hash-consed formula DAG.
+    nodes are only created by the constructor functions below (atom, conj, disj, box, diamond, negation), which look the node up in the
+    intern table first. every distinct subformula therefore exists exactly once and two formulas are equal iff they are the same node,
+    so comparisons are identity checks and the hash is precomputed.
+        op      'T', 'F', 'atom', 'not', 'and', 'or', 'box', 'dia'
+        args    tuple of child nodes
+        name    atom name, 'T' or 'F'
+        id      position in the intern table
+        hash    precomputed structural hash
+        depth   modal depth
+        size    number of atoms, constants and operators of the formula tree
+        fp      stable fingerprint, None until computed by fingerprint
+    formulas are in negation normal form, 'not' only ever wraps an atom. the complement of a node is computed once and cached on both nodes.
+    """
+    __slots__ = ('op', 'args', 'name', 'id', 'hash', 'depth', 'size', 'fp', '_neg')
+
+    def __hash__(self):
+        return self.hash
+
+    def __str__(self):
+        return formula_string(self)
+
+    def __repr__(self):
+        return 'Formula(' + repr(formula_string(self)) + ')'
+
+    def __reduce__(self):
+        # pickled as its string, unpickling parses it back into the intern table of the receiving process
+        return (tableux_representation, (formula_string(self),))
+
+
+# intern table, maps (op, name, child ids) to the unique node
+_formula_table = {}
+
+def _intern(op, args=(), name=None):
+    # keys are built from child ids, which hash and compare as plain ints
+    if len(args) == 2:
+        key = (op, args[0].id, args[1].id)
+    elif args:
+        key = (op, args[0].id)
+    else:
+        key = (op, name)
+    node = _formula_table.get(key)
+    if node is None:
+        node = object.__new__(Formula)
+        node.op = op
+        node.args = args
+        node.name = name
+        node.id = len(_formula_table)
+        node._neg = None
+        node.fp = None
+        if len(args) == 2:
+            phi, psi = args
+            node.hash = hash((op, phi.hash, psi.hash))
+            node.depth = phi.depth if phi.depth > psi.depth else psi.depth
+            node.size = 1 + phi.size + psi.size
+        elif args:
+            phi = args[0]
+            node.hash = hash((op, phi.hash))
+            node.depth = phi.depth + (op == 'box' or op == 'dia')
+            node.size = 1 + phi.size
+        else:
+            node.hash = hash(key)
+            node.depth = 0
+            node.size = 1
+        _formula_table[key] = node
+    return node
+
+TOP = _intern('T', name='T')
+BOTTOM = _intern('F', name='F')
+TOP._neg = BOTTOM
+BOTTOM._neg = TOP
+
+def atom(name):
+    return _intern('atom', name=name)
+
+def conj(phi, psi):
+    return _intern('and', (phi, psi))
+
+def disj(phi, psi):
+    return _intern('or', (phi, psi))
+
+def box(phi):
+    return _intern('box', (phi,))
+
+def diamond(phi):
+    return _intern('dia', (phi,))
+
+_dual = {'and': 'or', 'or': 'and', 'box': 'dia', 'dia': 'box'}
+
+def negation(phi):
+    """complement of phi in negation normal form. iterative, so deeply nested formulas do not hit the recursion limit."""
+    if phi._neg is not None:
+        return phi._neg
+    stack = [phi]
+    while stack:
+        node = stack[-1]
+        if node._neg is not None:
+            stack.pop()
+            continue
+        args = node.args
+        if node.op == 'atom':
+            neg = _intern('not', (node,))
+        elif len(args) == 2:
+            phi_neg, psi_neg = args[0]._neg, args[1]._neg
+            if phi_neg is None or psi_neg is None:
+                stack.extend([arg for arg in args if arg._neg is None])
+                continue
+            neg = _intern(_dual[node.op], (phi_neg, psi_neg))
+        else:
+            if args[0]._neg is None:
+                stack.append(args[0])
+                continue
+            neg = _intern(_dual[node.op], (args[0]._neg,))
+        node._neg = neg
+        neg._neg = node
+        stack.pop()
+    return phi._neg
+
+def formula_string(phi):
+    """renders phi in the input format of tableux_representation, or-nodes with | and dia-nodes with <>. the string parses back to the
+    same node, operands are only parenthesized where the precedence and grouping of the operators require it.
+    the pieces of the string are collected from an explicit stack and joined once, so the time is linear in the length of the string,
+    also for long chains of conjunctions, and deeply nested formulas do not hit the recursion limit."""
+    parts = []
+    stack = [phi]
+    while stack:
+        node = stack.pop()
+        if type(node) == str:
+            parts.append(node)
+            continue
+        op = node.op
+        if op == 'and' or op == 'or':
+            left, right = node.args
+            # & binds tighter than |, both group to the right
+            if op == 'and' and right.op == 'or':
+                stack.extend((')', right, '('))
+            else:
+                stack.append(right)
+            stack.append('&' if op == 'and' else '|')
+            if left.op == 'or' or op == 'and' and left.op == 'and':
+                stack.extend((')', left, '('))
+            else:
+                stack.append(left)
+        elif op == 'box' or op == 'dia':
+            arg = node.args[0]
+            if arg.op == 'and' or arg.op == 'or':
+                stack.extend((')', arg, '('))
+            else:
+                stack.append(arg)
+            stack.append('_' if op == 'box' else '<>')
+        elif op == 'not':
+            parts.append('not(' + node.args[0].name + ')')
+        else:
+            parts.append(node.name)
+    return ''.join(parts)
+
+def fingerprint(phi):
+    """stable 128-bit fingerprint of phi as 16 bytes, a digest of its structure. unlike id and hash it depends neither on the process nor
+    on the order formulas were parsed in, so it can key results that are kept across runs. iterative like negation, cached on the nodes."""
+    stack = [phi]
+    while stack:
+        node = stack[-1]
+        if node.fp is not None:
+            stack.pop()
+            continue
+        pending = [arg for arg in node.args if arg.fp is None]
+        if pending:
+            stack.extend(pending)
+            continue
+        digest = blake2b(node.op.encode(), digest_size=16)
+        if node.name is not None:
+            digest.update(b'\0' + node.name.encode())
+        for arg in node.args:
+            digest.update(arg.fp)
+        node.fp = digest.digest()
+        stack.pop()
+    return phi.fp
+
+
+### parser
+
 """
-    regular expression patterns
-        ""
-        [TF],
-        [a-z]+[0-9]*,
-        (.*)
-        not(.*)
-        &
-        _
+    tokens, whitespace between tokens is ignored
+        T, F                top, bottom
+        [a-z]+[0-9]*        boolean variable
+        not(                negation, opens a parenthesis
+        (  )                parentheses
+        &                   conjunction
+        |                   disjunction
+        ->                  implication
+        _                   box
+        <>                  diamond
+    _, <> and not( bind tightest, then &, then |, then ->. & and | group to the right, as does ->: 'p->q->r' is 'p->(q->r)'.
+    an empty conjunct, e.g. the trailing one in 'p&q&', or the empty formula stands for T, as in the original syntax. an empty operand of
+    '|' or '->' is an error, 'p|' would otherwise be T.
+    disjunctions, implications and diamonds go straight to or- and dia-nodes, 'p|q' is the same node as 'not(not(p)&not(q))'.
 """
 
+_token_pattern = re.compile(r"\s*(not\s*\(|[a-z]+[0-9]*|->|<>|\S)")
+
+
+class FormulaSyntaxError(ValueError):
+    """raised by tableux_representation for input that is not a formula. position is the character offset of the offending token."""
+
+    def __init__(self, message, position):
+        super().__init__(message + ' at position ' + str(position))
+        self.position = position
+
+
+@lru_cache(maxsize=1024)
 def tableux_representation(phi):
-    """recursive function that parses input formula string into a tableux representation that can be easily evaluated for satisfiability.
+    """parses input formula string into a tableux representation that can be easily evaluated for satisfiability.
+    single pass over the tokens with an explicit stack of open parentheses instead of recursion, so parsing is linear in the length of phi
+    and deeply nested formulas do not hit the recursion limit. subformulas are built bottom-up as hash-consed nodes, 'not(' is applied
+    with negation when its parenthesis closes, 'a->b' is built as the or-node of the complement of a and b.
+    results are memoized, so formulas that are checked repeatedly are parsed once.
     input: formula phi of type string in specified input format.
-    output:
-        empty list                      in case of empty string
-        single element list             in case of top, bottom, (not-)literal
-        (sub-)formula string            in case of (not-)literal
-        one recurisve call              in case of parenthesis (no branching)
-        one recursive call              in case of double negation, not-rule application (no branching)
-        list of two recursive calls     in case of and-operator (conjunction), and-rule application (and branching), (or node)
-        3-tuple of two recursive calls    in case of or-operator (disjunction), not-and-rule application (or branching), (or node)
-        1-tuple of one recursive call     in case of box-operator (necessity)
-        2-tuple of one recursive call       in case of not-box-operator, box-rule applicattion (and node)
+    output: formula node of the hash-consed DAG in negation normal form
+        TOP, BOTTOM, (not-)literal      in case of top, bottom, (not-)literal
+        and-node                        in case of and-operator (conjunction), and-rule application (and branching)
+        or-node                         in case of or-operator, implication or negated conjunction, not-and-rule application (or branching)
+        box-node                        in case of box-operator (necessity)
+        dia-node                        in case of diamond or not-box-operator, box-rule applicattion (and node)
     """
-
-    # remove whitespaces
-    phi = phi.replace(" ", "")
-    
-    ### case distinction on phi
-    # phi is the empty string
-    if not phi:
-        return []
-    # phi is top or bottom
-    elif phi in ['T', 'F', 'not(T)', 'not(F)']:
-        return [phi]
-    # phi is a single positive literal
-    elif re.fullmatch(r"[a-z]+[0-9]*", phi):
-        return [phi]
-    # phi starts with a parenthesis
-    # the parenthesis expression either spans the whole formula or a subformula. The subformula must be a conjunct.
-    elif phi.startswith("("):
-        # determine if parenthesis spans the whole formula and if not
-        # split the formula into the two highest level conjuncts that are determined by the position of the closing parenthesis of the first opening parenthesis
-        phi_list = first_parenthesised_subformula(phi)
-        # spans whole formula
-        if len(phi_list) == 1:
-            # remove parenthesis
-            phi = phi.removeprefix("(")
-            phi = phi.removesuffix(")")
-            return tableux_representation(phi)
-        # spans a top-level conjunct
-        if len(phi_list) == 3:
-            # apply and-rule
-            # list to indicate conjunction
-            return [tableux_representation(phi_list[0]), tableux_representation(phi_list[2])]
-    # phi starts with not-parenthesis
-    # spans whole formula or subformula (top-level conjunct)
-    elif phi.startswith("not("):
-        phi_list = first_parenthesised_subformula(phi)
-
-        # spans whole formula, thus either not-literal, not-rule application, not-and-rule application, not-box-rule application
-        if len(phi_list) == 1:
-            # remove the not-parenthesis
-            phi = phi.removeprefix("not(").removesuffix(")")
-
-            # not-literal
-            # regular expression matches only a literal
-            if re.fullmatch(r"[a-z]+[0-9]*", phi):
-                # return not-literal as a single element list
-                return ["not(" + phi + ")"]
-
-            # not-rule or not-and-rule
-            elif phi.startswith("not("):
-                phi_list_3 = first_parenthesised_subformula(phi)
-                # second not-parenthesis spans whole formula, not-rule applies
-                if len(phi_list_3) == 1:
-                    # not-rule
-                    # remove second not-parenthesis
-                    phi = phi.removeprefix("not(")
-                    phi = phi.removesuffix(")")
-                    return tableux_representation(phi)
-                # second not-parenthesis does not span whole formula, not-and-rule applies
-                elif len(phi_list_3) == 3:
-                    # tuple to indicate or-node
-                    return ('or', tableux_representation(negate(phi_list_3[0])), tableux_representation(negate(phi_list_3[2])))
-            
-            # not-box or not-and-rule
-            elif phi.startswith('_'):
-
-                count_boxes = 0
-                while phi.startswith('_'):
-                    count_boxes += 1
-                    phi = phi.removeprefix('_')
-                assert not phi.startswith('_')
-
-                phi_list_4 = first_parenthesised_subformula(phi)
-                # box is not parenthesised
-                # either literal and thus not-box or not-and
-                # literal, not-box
-                if re.fullmatch(r'[a-z]+[0-9]*', phi):
-                    assert count_boxes > 0
-                    return ('not', tableux_representation(negate('_' * (count_boxes-1) + phi)))
-                #
-                elif phi.startswith('not('):
-                    pass
-                # not parenthesised, not-and
-                elif re.match(r'[a-z]+[0-9]*', phi):
-                    phi_tuple_5 = phi.partition('&')
-                    assert phi_tuple_5[1] and phi_tuple_5[2]
-                    return ('or', tableux_representation(negate('_' * count_boxes + phi_tuple_5[0])), tableux_representation(negate(phi_tuple_5[2])))
-                
-                # not-box
-                if len(phi_list_4) == 1:
-                    assert count_boxes > 0
-                    return ('not', tableux_representation(negate('_' * (count_boxes-1) + phi)))
-                # not-and
-                elif len(phi_list_4) == 3:
-                    return ('or', tableux_representation(negate('_' * count_boxes + phi_list_4[0])), tableux_representation(negate(phi_list_4[2])))
-                else:
-                    assert False
-                
-            else:
-                # finds top-level "&" to which it applies, similar behaviour to string method partition
-                phi_list_6 = first_parenthesised_subformula(phi)
-                if len(phi_list_6) == 3:
-                    # tuple to indicate or-node
-                    return ('or', tableux_representation(negate(phi_list_6[0])), tableux_representation(negate(phi_list_6[2])))
-                elif parenthesised_formula(phi):
-                    return tableux_representation('not' + phi)
+    # parsing allocates one node per new subformula, the cyclic garbage collector is paused meanwhile
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _parse(phi)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _parse(phi):
+    tokens = _token_pattern.findall(phi)
+    # one frame per open parenthesis: [operands, negated, pending modal operators, token index, disjuncts, antecedents]
+    # operands are the conjuncts read so far, None for an empty conjunct. the pending modal operators are a list of '_' and '<'.
+    # disjuncts are the conjunctions before the last '|', antecedents the disjunctions before the last '->', both None until needed
+    frame = [[], False, [], 0, None, None]
+    stack = []
+    # True after an operand, until the next binary operator
+    complete = False
+    for i, token in enumerate(tokens):
+        if token == '&' or token == '|' or token == '->':
+            if not complete:
+                if frame[2]:
+                    _syntax_error("modal operator without operand", phi, i)
+                frame[0].append(None)
+            complete = False
+            if token != '&':
+                if not any([operand is not None for operand in frame[0]]):
+                    _syntax_error("empty operand of '" + token + "'", phi, i)
+                _disjunct(frame, token)
+            continue
+        if token == ')':
+            if not stack:
+                _syntax_error("unbalanced ')'", phi, i)
+            if not complete:
+                if frame[2]:
+                    _syntax_error("modal operator without operand", phi, i)
+                frame[0].append(None)
+            if _empty_operand(frame):
+                _syntax_error("empty operand of '" + _empty_operand(frame) + "'", phi, i)
+            node = _conjunction(frame[0]) if frame[4] is None and frame[5] is None else _implication(frame)
+            if frame[1]:
+                node = BOTTOM if node is None else negation(node)
+            frame = stack.pop()
+            if node is None:
+                if frame[2]:
+                    _syntax_error("modal operator without operand", phi, i)
+                frame[0].append(None)
+                complete = True
+                continue
+        elif complete:
+            _syntax_error("expected '&', '|', '->' or ')'", phi, i)
+        elif token == '_' or token == '<>':
+            frame[2].append(token[0])
+            continue
+        elif token == '(' or token[-1] == '(':
+            stack.append(frame)
+            frame = [[], token != '(', [], i, None, None]
+            continue
+        elif token == 'T':
+            node = TOP
+        elif token == 'F':
+            node = BOTTOM
+        elif 'a' <= token[0] <= 'z':
+            node = atom(token)
+        else:
+            _syntax_error('unexpected character ' + repr(token), phi, i)
+        # operand complete, apply the pending modal operators, innermost last
+        if frame[2]:
+            for op in reversed(frame[2]):
+                node = box(node) if op == '_' else diamond(node)
+            frame[2] = []
+        frame[0].append(node)
+        complete = True
+    if stack:
+        _syntax_error("unclosed parenthesis", phi, frame[3])
+    if not complete:
+        if frame[2]:
+            _syntax_error("modal operator without operand", phi, len(tokens))
+        frame[0].append(None)
+    if _empty_operand(frame):
+        _syntax_error("empty operand of '" + _empty_operand(frame) + "'", phi, len(tokens))
+    node = _conjunction(frame[0]) if frame[4] is None and frame[5] is None else _implication(frame)
+    return TOP if node is None else node
+
+def _syntax_error(message, phi, index):
+    """raises FormulaSyntaxError for the token with the given index. the position is only looked up here, off the fast path."""
+    position = len(phi)
+    for i, match in enumerate(_token_pattern.finditer(phi)):
+        if i == index:
+            position = match.start(1)
+            break
+    raise FormulaSyntaxError(message, position)
+
+def _conjunction(operands):
+    """right-nested and-node of the operands, empty operands are dropped. None if all operands are empty."""
+    node = None
+    for operand in reversed(operands):
+        if operand is not None:
+            node = operand if node is None else conj(operand, node)
+    return node
+
+def _empty_operand(frame):
+    """the operator, '|' or '->', whose right operand is the conjunction of the frame if that is empty, otherwise None."""
+    if frame[4] is None and frame[5] is None or any([operand is not None for operand in frame[0]]):
+        return None
+    return '|' if frame[4] is not None else '->'
+
+def _disjunct(frame, token):
+    """ends the conjunction of the frame, which is not empty, at the operator token, '|' or '->'."""
+    node = _conjunction(frame[0])
+    frame[0] = []
+    if frame[4] is None:
+        frame[4] = []
+    frame[4].append(node)
+    if token == '->':
+        if frame[5] is None:
+            frame[5] = []
+        frame[5].append(_disjunction(frame[4]))
+        frame[4] = None
+
+def _disjunction(operands):
+    """right-nested or-node of the operands."""
+    node = operands[-1]
+    for operand in reversed(operands[:-1]):
+        node = disj(operand, node)
+    return node
+
+def _implication(frame):
+    """formula of a frame with '|' or '->', the implications of the disjunctions group to the right, a->b is not(a)|b."""
+    node = _disjunction((frame[4] or []) + [_conjunction(frame[0])])
+    for antecedent in reversed(frame[5] or []):
+        node = disj(negation(antecedent), node)
+    return node
+
+
+
+### simplification
+
+def simplify(phi, return_report=False):
+    """equivalent formula for phi that is cheaper for the tableux, bottom-up over the DAG:
+        T and F are folded into and-, or-, box- and dia-nodes, e.g. p&F is F, _T is T
+        conjunctions and disjunctions are flattened and duplicates dropped, a formula and its complement fold to F resp. T
+        subsumed operands are dropped by absorption, p&(p|q) is p and p|(p&q) is p
+        boxes of a conjunction are merged, _a&_b is _(a&b), and dually diamonds of a disjunction
+    double negations need no pass, negation normal form removes them when the formula is parsed.
+    iterative like negation, each node of the DAG is simplified once.
+    output: simplified formula node, with return_report the pair (node, report), report a dict
+        size_before, size_after     formula tree size, Formula.size
+        nodes_before, nodes_after   distinct nodes of the DAG
+    """
+    done = {TOP: TOP, BOTTOM: BOTTOM}
+    stack = [phi]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        op = node.op
+        if op == 'atom' or op == 'not':
+            done[node] = node
+            stack.pop()
+            continue
+        # the operands of a whole chain of and- resp. or-nodes are simplified together
+        operands = _operands(node) if op == 'and' or op == 'or' else node.args
+        pending = [arg for arg in operands if arg not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        if op == 'and' or op == 'or':
+            result, inner = _simplify_junction(op, [done[arg] for arg in operands], done)
+            if result is None:
+                # the contents of merged boxes resp. diamonds have to be simplified together first
+                stack.append(inner)
+                continue
+        elif op == 'box':
+            result = TOP if done[node.args[0]] is TOP else box(done[node.args[0]])
+        else:
+            result = BOTTOM if done[node.args[0]] is BOTTOM else diamond(done[node.args[0]])
+        done[node] = result
+        stack.pop()
+    if not return_report:
+        return done[phi]
+    report = {'size_before': phi.size, 'size_after': done[phi].size,
+              'nodes_before': _count_nodes(phi), 'nodes_after': _count_nodes(done[phi])}
+    return done[phi], report
+
+
+def _operands(phi):
+    """operands of the chain of phi.op-nodes below phi, left to right."""
+    op = phi.op
+    operands = []
+    stack = [phi]
+    while stack:
+        node = stack.pop()
+        if node.op == op:
+            stack.append(node.args[1])
+            stack.append(node.args[0])
+        else:
+            operands.append(node)
+    return operands
+
+
+def _chain(op, operands):
+    """right-nested op-node of the operands, op 'and' or 'or'."""
+    node = operands[-1]
+    for operand in reversed(operands[:-1]):
+        node = _intern(op, (operand, node))
+    return node
+
+
+def _simplify_junction(op, operands, done):
+    """simplified op-node, op 'and' or 'or', of simplified operands. done maps simplified nodes to their simplification.
+    output: (node, None), or (None, inner) if the junction inner of the contents of boxes resp. diamonds to merge is not simplified yet"""
+    unit, zero, dual, modal = (TOP, BOTTOM, 'or', 'box') if op == 'and' else (BOTTOM, TOP, 'and', 'dia')
+    flat = []
+    for operand in operands:
+        flat.extend(_operands(operand) if operand.op == op else [operand])
+    kept = []
+    seen = set()
+    for operand in flat:
+        if operand is zero or operand._neg is not None and operand._neg in seen:
+            return zero, None
+        if operand is not unit and operand not in seen:
+            seen.add(operand)
+            kept.append(operand)
+    # absorption, the dual operands are flattened, so none of their own operands is dropped here
+    kept = [operand for operand in kept if operand.op != dual or not any([arg in seen for arg in _operands(operand)])]
+    modals = [operand for operand in kept if operand.op == modal]
+    if len(modals) > 1:
+        inner = _chain(op, [operand.args[0] for operand in modals])
+        if inner not in done:
+            return None, inner
+        if op == 'and':
+            merged = TOP if done[inner] is TOP else box(done[inner])
+        else:
+            merged = BOTTOM if done[inner] is BOTTOM else diamond(done[inner])
+        if merged is zero:
+            return zero, None
+        first = kept.index(modals[0])
+        kept = kept[:first] + ([] if merged is unit else [merged]) + [operand for operand in kept[first:] if operand.op != modal]
+    if not kept:
+        return unit, None
+    return _chain(op, kept), None
+
+
+def _count_nodes(phi):
+    """number of distinct nodes of the DAG below phi."""
+    seen = {phi}
+    stack = [phi]
+    while stack:
+        for arg in stack.pop().args:
+            if arg not in seen:
+                seen.add(arg)
+                stack.append(arg)
+    return len(seen)
+
+
+
+### canonical form
+
+def canonical(phi, rename=False):
+    """canonical form of phi up to commutativity and associativity: chains of and- resp. or-nodes are flattened, duplicate operands
+    dropped and the operands sorted in a stable order, then chained right-nested again. permuted and regrouped variants of a formula,
+    e.g. (p&q)&r and r&(q&p), become the same node and so get the same fingerprint. negations need no pass, formulas are in negation
+    normal form.
+    operands are sorted by their shape, a fingerprint that is blind to atom names, and by their fingerprint among equal shapes.
+    with rename the atoms are renamed x0, x1, ... in the order of their first occurrence and the formula is sorted again, so that most
+    formulas that differ by a renaming of atoms meet as well. atoms are told apart by the shapes of the formulas they occur in first,
+    only operands whose shapes are still equal keep the order of their original names. renaming the atoms of a whole formula preserves
+    its satisfiability, renamed forms are keys for whole formulas, not for subformulas.
+    iterative like negation."""
+    result, shapes = _canonical(phi)
+    if not rename:
+        return result
+    # the shape of an atom becomes the shapes of its parents, the formula is sorted by these shapes
+    parents = {}
+    for node, shape in shapes.items():
+        for arg in node.args:
+            if arg.op == 'not':
+                parents.setdefault(arg.args[0], []).append(b'-' + shape)
+            elif arg.op == 'atom':
+                parents.setdefault(arg, []).append(shape)
+    colours = {node: b''.join(sorted(occurrences)) for node, occurrences in parents.items()}
+    result, _ = _canonical(result, colours=colours)
+    # atoms in preorder, the operands are in canonical order now
+    names = {}
+    seen = set()
+    stack = [result]
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            if node.op == 'atom':
+                names[node] = 'x' + str(len(names))
+            stack.extend(reversed(node.args))
+    return _canonical(result, names)[0]
+
+
+def _canonical(phi, names=None, colours=None):
+    """canonical form of phi with the atoms renamed by the dict names, and the dict shapes of the canonical nodes. colours maps atoms
+    to bytes that are added to their shape. see canonical."""
+    done = {}
+    shapes = {}
+    stack = [phi]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        op = node.op
+        operands = _operands(node) if op == 'and' or op == 'or' else node.args
+        pending = [arg for arg in operands if arg not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        if op == 'and' or op == 'or':
+            # an operand whose duplicate operands collapsed to a single op-node is merged into the chain as well
+            kept = set()
+            for arg in operands:
+                arg = done[arg]
+                if arg.op == op:
+                    kept.update(_operands(arg))
                 else:
-                     # first and-operator & is on highest level
-                    phi_tuple_7 = phi.partition("&")
-
-                     # tuple to indicate or-node
-                    return ('or', tableux_representation(negate(phi_tuple_7[0])), tableux_representation(negate(phi_tuple_7[2])))
-        # and-case
-        elif len(phi_list) == 3:
-            # apply and-rule
-            # list to indicate and-node
-            return [tableux_representation(phi_list[0]), tableux_representation(phi_list[2])]
-    
-    # starts with a literal and must continue with an and-connective or must be an axiom
-    elif re.match(r"[a-z]+[0-9]*", phi) or (phi.partition('&')[0] in ['T', 'F', 'not(T)', 'not(F)']):
-        if re.fullmatch(r"[a-z]+[0-9]*", phi): # formula is one literal
-            return phi
+                    kept.add(arg)
+            kept = sorted(kept, key=lambda arg: (shapes[arg], fingerprint(arg)))
+            result = _chain(op, kept)
+            parts = [shapes[arg] for arg in kept]
+        elif op == 'atom':
+            result = node if names is None else atom(names[node])
+            parts = [] if colours is None else [colours.get(node, b'')]
+        elif op == 'not':
+            result = negation(done[node.args[0]])
+            parts = [shapes[done[node.args[0]]]]
+        elif op == 'box' or op == 'dia':
+            result = _intern(op, (done[node.args[0]],))
+            parts = [shapes[done[node.args[0]]]]
         else:
-            # and-rule applies
-            # first occurence of and-connective is a top-level connective
-            phi_list = phi.partition("&")
-            return [tableux_representation(phi_list[0]), tableux_representation(phi_list[2])] # list to indicate and-node
-    
-    # box-case
-    elif phi.startswith("_"):
-
-        count_boxes = 0
-        while phi.startswith('_'):
-            count_boxes += 1
-            phi = phi.removeprefix('_')
-        assert not phi.startswith('_')
-        
-        phi_list = first_parenthesised_subformula(phi)
-
-        # continues with literal, box-case
-        if re.fullmatch(r'[a-z]+[0-9]*', phi):
-            return ret_tuple(phi, count_boxes)
-        elif phi.startswith('not('):
-            pass
-        # and-case
-        elif re.match(r'[a-z]+[0-9]*', phi):
-            phi_tuple = phi.partition('&')
-            assert phi_tuple[1] and phi_tuple[2]
-            return [tableux_representation('_' * count_boxes + phi_tuple[0]), tableux_representation(phi_tuple[2])]
-        
-        # continues with parenthesis or not-parenthesis
-        assert phi_list
-        # spans whole formula, box-case
-        if len(phi_list) == 1:
-            return ret_tuple(phi, count_boxes)
-        # spans subformula, and-case
-        elif len(phi_list) == 3:
-            assert phi_list[0] and phi_list[1] and phi_list[2]
-            return [tableux_representation('_' * count_boxes + phi_list[0]), tableux_representation(phi_list[2])]
+            result = node
+            parts = []
+        if result not in shapes:
+            shapes[result] = blake2b(op.encode() + b''.join(parts), digest_size=16).digest()
+        done[node] = result
+        stack.pop()
+    return done[phi], shapes
+
+
+def canonical_fingerprint(phi):
+    """fingerprint of the canonical form with renamed atoms of phi, a formula node or a list of formula nodes taken as their conjunction.
+    the key of a formula for deduplication and the ResultStore, equal for formulas that only differ by commutativity, associativity and
+    mostly by a renaming of atoms, see canonical."""
+    if type(phi) == list:
+        phi = _chain('and', phi)
+    return fingerprint(canonical(phi, rename=True))
+
+
+
+### world cache
+
+class SatCache:
+    """bounded LRU map from the canonical label set of a world, its label_key, to its satisfiability.
+    a world's satisfiability only depends on its label set, so a set proven sat or unsat anywhere in the tableux is never expanded again.
+    maxsize is the number of label sets kept, None for no bound. hits and misses count the lookups."""
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._verdicts = OrderedDict()
+
+    def __len__(self):
+        return len(self._verdicts)
+
+    def get(self, labels):
+        """cached verdict of the label set or None."""
+        verdict = self._verdicts.get(labels)
+        if verdict is None:
+            self.misses += 1
         else:
-            assert False
-
-def ret_tuple(phi, count_boxes, not_box=False):
-    """wraps formula phi in the number of 1-tupel given by positional argument count boxes."""
-    assert count_boxes > 0
-    ret = (tableux_representation(phi),)
-    count_boxes -= 1
-    while count_boxes > 0:
-        ret = (ret,)
-        count_boxes -= 1
-    return ret
+            self.hits += 1
+            self._verdicts.move_to_end(labels)
+        return verdict
+
+    def peek(self, labels):
+        """cached verdict of the label set or None, without counting the lookup or refreshing the entry."""
+        return self._verdicts.get(labels)
+
+    def put(self, labels, verdict):
+        self._verdicts[labels] = verdict
+        self._verdicts.move_to_end(labels)
+        if self.maxsize is not None:
+            while len(self._verdicts) > self.maxsize:
+                self._verdicts.popitem(last=False)
+
+    def clear(self):
+        self._verdicts.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'size': len(self._verdicts), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+    def key(self, labels):
+        """key of the label list labels in the cache."""
+        return label_key(labels)
+
+
+def label_key(labels):
+    """key of the set of formulas labels in a SatCache, the sorted distinct node ids packed into bytes, 4 bytes per label instead of the
+    hash table of a frozenset."""
+    return array('I', sorted({phi.id for phi in labels})).tobytes()
+
+def label_fingerprint(labels):
+    """stable counterpart of label_key, the 128-bit fingerprint of the set of formulas labels."""
+    return blake2b(b''.join(sorted({fingerprint(phi) for phi in labels})), digest_size=16).digest()
+
+
+# shared by all calls of tableux_method that do not pass their own cache
+world_cache = SatCache()
+
+
+def formula_count():
+    """number of nodes in the intern table. the table keeps every subformula the process has seen, see reset_formulas."""
+    return len(_formula_table)
+
+
+def reset_formulas():
+    """empties the intern table and the caches that refer to its nodes: the parse cache of tableux_representation, world_cache and the
+    NogoodStore of a worker process. a long-running process, e.g. a worker of tableux_server.py, calls it between two formulas once the
+    table has grown too large, since nodes are never evicted one by one: a node stays valid as long as it is in the table, and the cost of
+    a weak-valued table would be paid by every node the parser builds. node ids are reused afterwards, so no node, label_key or SatCache of
+    before may be used any more. TOP and BOTTOM stay."""
+    global _task_nogoods
+    _formula_table.clear()
+    _formula_table[('T', 'T')] = TOP
+    _formula_table[('F', 'F')] = BOTTOM
+    tableux_representation.cache_clear()
+    world_cache.clear()
+    _task_nogoods = None
+
+
+
+### nogood store
+
+class NogoodStore:
+    """bounded LRU store of nogoods, sets of formulas that are unsatisfiable together, with subset lookup.
+    a world is unsatisfiable as soon as its labels contain a nogood, so unlike SatCache, which only answers worlds with exactly the same
+    label set, the store also closes every world with more labels. TableuxEngine records the core of each unsatisfiable world, the labels
+    its clashes depend on, and looks up every successor world before it is expanded.
+    each nogood is watched by one of its formulas, the one watching the fewest nogoods when it is added. a lookup only checks the nogoods
+    watched by the formulas of the query, first against the query's signature, a 64-bit bitset of the formula ids modulo 64, then as
+    sets. a nogood that contains a stored one is not added.
+    whether a set of formulas is unsatisfiable depends on the modal logic, the nogoods of each logic are kept apart by its ModalLogic.tag,
+    so one store can be shared by runs of different logics.
+    maxsize is the number of nogoods kept, None for no bound. hits and misses count the lookups."""
+
+    def __init__(self, maxsize=16384):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # (tag, nogood) -> (signature, watching formula)
+        self._nogoods = OrderedDict()
+        # tag -> watching formula -> nogoods
+        self._watches = {}
+
+    def __len__(self):
+        return len(self._nogoods)
+
+    def find(self, labels, tag=b''):
+        """a stored nogood of the logic with the given tag contained in the formulas labels, None if there is none."""
+        nogood = self._find(set(labels), tag)
+        if nogood is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._nogoods.move_to_end((tag, nogood))
+        return nogood
+
+    def _find(self, members, tag):
+        watches = self._watches.get(tag)
+        if watches is None:
+            return None
+        sig = signature(members)
+        for phi in members:
+            for nogood in watches.get(phi, ()):
+                if not self._nogoods[tag, nogood][0] & ~sig and nogood <= members:
+                    return nogood
+        return None
+
+    def add(self, labels, tag=b''):
+        """stores the formulas labels as a nogood of the logic with the given tag unless they contain a stored one."""
+        nogood = frozenset(labels)
+        if not nogood or self._find(nogood, tag) is not None:
+            return
+        watches = self._watches.setdefault(tag, {})
+        watch = min(nogood, key=lambda phi: len(watches.get(phi, ())))
+        self._nogoods[tag, nogood] = (signature(nogood), watch)
+        watches.setdefault(watch, set()).add(nogood)
+        if self.maxsize is not None:
+            while len(self._nogoods) > self.maxsize:
+                (tag, nogood), (_, watch) = self._nogoods.popitem(last=False)
+                watched = self._watches[tag][watch]
+                watched.discard(nogood)
+                if not watched:
+                    del self._watches[tag][watch]
+
+    def clear(self):
+        self._nogoods.clear()
+        self._watches.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'size': len(self._nogoods), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def signature(formulas):
+    """64-bit signature of a set of formulas, a superset has all bits of the signatures of its subsets."""
+    sig = 0
+    for phi in formulas:
+        sig |= 1 << (phi.id & 63)
+    return sig
+
+
+
+### result store
+
+# version of the verdicts and fingerprints, a ResultStore discards the results of other versions. to be increased with every change of
+# the engines that may change a verdict and every change of fingerprint or canonical
+ENGINE_VERSION = 3
+
+
+class ResultStore:
+    """persistent cache of verdicts in an SQLite database file, shared by the runs of the program.
+        formulas    canonical_fingerprint of the formulas of a tableux_method call -> verdict, TableuxStats.as_dict() of the run
+        worlds      label_fingerprint of the labels of a world -> verdict, kept by the StoredSatCache cache of the store
+    each table keeps at most max_entries rows, the least recently used ones are evicted on commit. the results of another ENGINE_VERSION
+    are discarded when the file is opened. writes are buffered until commit, which tableux_method does after every call.
+    cache_size is the size of the in-memory layer of cache. usable as a context manager, which closes the store."""
+
+    def __init__(self, path, max_entries=1000000, cache_size=65536, version=ENGINE_VERSION):
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        # a commit is an append to the write-ahead log, without waiting for the disk
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            execute = self.connection.execute
+            execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            execute('CREATE TABLE IF NOT EXISTS formulas (key BLOB PRIMARY KEY, verdict INTEGER, stats TEXT, used REAL)')
+            execute('CREATE TABLE IF NOT EXISTS worlds (key BLOB PRIMARY KEY, verdict INTEGER, used REAL)')
+            execute('CREATE INDEX IF NOT EXISTS formulas_used ON formulas (used)')
+            execute('CREATE INDEX IF NOT EXISTS worlds_used ON worlds (used)')
+            row = execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != str(version):
+                execute('DELETE FROM formulas')
+                execute('DELETE FROM worlds')
+                execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(version),))
+        self.sizes = {table: self.connection.execute('SELECT COUNT(*) FROM ' + table).fetchone()[0] for table in ('formulas', 'worlds')}
+        # rows to insert and keys to mark as used by the next commit
+        self.pending = {'formulas': {}, 'worlds': {}}
+        self.used = {'formulas': set(), 'worlds': set()}
+        self.hits = {'formulas': 0, 'worlds': 0}
+        self.misses = {'formulas': 0, 'worlds': 0}
+        self.cache = StoredSatCache(self, cache_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get(self, table, key, columns):
+        row = self.pending[table].get(key)
+        if row is None:
+            row = self.connection.execute('SELECT ' + columns + ' FROM ' + table + ' WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.used[table].add(key)
+        if row is None:
+            self.misses[table] += 1
+        else:
+            self.hits[table] += 1
+        return row
+
+    def get_formula(self, key):
+        """(verdict, stats dict) stored for the formulas with canonical_fingerprint key, None if there is none."""
+        row = self._get('formulas', key, 'verdict, stats')
+        return None if row is None else (bool(row[0]), json.loads(row[1]))
+
+    def put_formula(self, key, verdict, stats):
+        self.pending['formulas'][key] = (int(verdict), json.dumps(stats))
+
+    def get_world(self, key):
+        """verdict stored for the world with label_fingerprint key, None if there is none."""
+        row = self._get('worlds', key, 'verdict')
+        return None if row is None else bool(row[0])
+
+    def put_world(self, key, verdict):
+        self.pending['worlds'][key] = (int(verdict),)
+
+    def commit(self):
+        """writes the buffered results and evicts the least recently used rows above max_entries."""
+        now = time.time()
+        with self.connection:
+            for table, rows in self.pending.items():
+                if rows:
+                    marks = ', '.join('?' * (len(next(iter(rows.values()))) + 2))
+                    # the verdict of a key never changes, rows that are already stored are kept
+                    cursor = self.connection.executemany('INSERT OR IGNORE INTO ' + table + ' VALUES (' + marks + ')',
+                                                         [(key,) + row + (now,) for key, row in rows.items()])
+                    self.sizes[table] += cursor.rowcount
+                    rows.clear()
+                if self.used[table]:
+                    self.connection.executemany('UPDATE ' + table + ' SET used = ? WHERE key = ?', [(now, key) for key in self.used[table]])
+                    self.used[table].clear()
+                if self.max_entries is not None and self.sizes[table] > self.max_entries:
+                    self.connection.execute('DELETE FROM ' + table + ' WHERE key IN (SELECT key FROM ' + table + ' ORDER BY used LIMIT ?)',
+                                            (self.sizes[table] - self.max_entries,))
+                    self.sizes[table] = self.max_entries
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+    def stats(self):
+        return {table: {'size': self.sizes[table] + len(self.pending[table]), 'max_entries': self.max_entries, 'hits': self.hits[table],
+                        'misses': self.misses[table]} for table in self.sizes}
+
+
+class StoredSatCache(SatCache):
+    """SatCache in front of the worlds table of a ResultStore. its keys are label_fingerprint, which are stable across processes. a label
+    set that is not in memory is looked up in the store, verdicts are put into both. hits and misses count the lookups of the memory
+    layer."""
+
+    def __init__(self, store, maxsize=65536):
+        super().__init__(maxsize)
+        self.store = store
+
+    def key(self, labels):
+        return label_fingerprint(labels)
+
+    def get(self, labels):
+        verdict = super().get(labels)
+        if verdict is None:
+            verdict = self.store.get_world(labels)
+            if verdict is not None:
+                SatCache.put(self, labels, verdict)
+        return verdict
+
+    def put(self, labels, verdict):
+        super().put(labels, verdict)
+        self.store.put_world(labels, verdict)
+
+
+
+### literal index
+
+class LiteralIndex:
+    """index of the literals on a branch, the atoms asserted positive and negative as int bitsets.
+    literals are added as the engine reaches them, so a clash is found the moment the complementary literal arrives.
+    the bitsets are immutable ints, a choice point saves them with state() and backtracking restores them, there is nothing to remove
+    literal by literal. bits maps the node ids of the atoms of the branch to their bits, numbered in the order the atoms are reached, so the
+    bitsets are as wide as the atoms of the world and not as all atoms the process has seen. bits only grows, a restored state just has
+    no bits set for the atoms reached after it."""
+    __slots__ = ('positive', 'negative', 'bits')
+
+    def __init__(self):
+        self.positive = 0
+        self.negative = 0
+        self.bits = {}
+
+    def add(self, lit):
+        """adds the literal, top or bottom lit. returns False if lit clashes with the branch."""
+        op = lit.op
+        if op == 'atom':
+            bit = self.bits.get(lit.id)
+            if bit is None:
+                bit = self.bits[lit.id] = 1 << len(self.bits)
+            elif self.negative & bit:
+                return False
+            self.positive |= bit
+        elif op == 'not':
+            atom_id = lit.args[0].id
+            bit = self.bits.get(atom_id)
+            if bit is None:
+                bit = self.bits[atom_id] = 1 << len(self.bits)
+            elif self.positive & bit:
+                return False
+            self.negative |= bit
+        elif lit is BOTTOM:
+            return False
+        return True
 
-def first_parenthesised_subformula(phi):
-    """ input: 
-            formula phi of type string
-            formula phi starts with '(' or 'not('
-            input formula starts neither with '(' nor 'not(' -> no parenthesis outputs empty list, 
-        output:
-            empty list []
-            single element list (opening parenthesis is only closed at the end of the string)
-            three element list: splits string into two conjuncts after first opening parenthesis is closed
+    def state(self):
+        return self.positive, self.negative
+
+    def restore(self, state):
+        self.positive, self.negative = state
+
+
+
+### statistics
+
+class TableuxStats:
+    """counters of a run of TableuxEngine, pass one to tableux_method to have it filled in.
+        worlds              worlds expanded by the engine
+        worlds_sat          worlds found satisfiable, world_time_sat the seconds spent in them including their successors
+        worlds_unsat        worlds found unsatisfiable, world_time_unsat the seconds spent in them including their successors
+        worlds_skipped      successor worlds never solved because a sibling was unsatisfiable first
+        propagations        disjuncts asserted without a choice point because the other disjunct was refuted
+        pure_literals       disjuncts asserted without a choice point because they are pure literals
+        choice_points       or-nodes branched on
+        branches_opened     branches started at a choice point, first and second disjuncts
+        branches_closed     branches closed by a clash or an unsatisfiable successor world
+        backjumps           second disjuncts skipped because the clash did not depend on their choice point
+        semantic_lemmas     complements of refuted first disjuncts asserted on the second branch by semantic branching
+        rule_and            and-nodes expanded
+        rule_or             or-nodes reached, whether branched on, propagated or already satisfied
+        rule_box            box-node formulas carried into successor worlds
+        rule_dia            successor worlds opened by dia-nodes, including the ones answered by the world cache
+        clashes             branches closed by the clash rule, a formula and its complement or both disjuncts of an or-node refuted
+        max_branch_depth    most choice points open at once, across the stack of worlds
+        max_modal_depth     longest chain of successor worlds on the stack, the root world has modal depth 0
+        cache_hits          successor worlds answered by the world cache
+        nogood_hits         worlds closed by a NogoodStore because their labels contain a stored nogood
+        blocked_worlds      successor worlds of a transitive logic blocked by a world on the stack with the same labels, see ModalLogic
+        learned_clauses     clauses learned by the CDCL core of the KSAT engine, which counts its decisions as choice_points, its
+                            conflicts as clashes and its implied literals as propagations
+        store_hits          calls of tableux_method answered by a ResultStore without solving
+        size_before         with preprocess, Formula.size of the input formulas, size_after of their simplification, 0 without
+        stopped             reason a Budget stopped the run with the verdict UNKNOWN, None if the run finished
+    worker processes count into their own TableuxStats, which are not added to the ones of the engine.
     """
-    phi = phi.replace(" ", "")
-    # start counting parenthesis at the position of the first opening parenthesis
-    i = phi.find("(")
-    if i >= 0:
-        count = 0
-        for j,c in enumerate(phi[i:]):
-            if c == "(":
-                count += 1
-            elif c == ")":
-                count -= 1
-            elif count == 0:
-                # phi does not end with a closing parenthesis ")"
-                return [phi[:(i+j)], phi[(i+j)], phi[(i+j+1):]]
-        # phi ends with a closing parenthesis ")"
-        return [phi]
-    return []
-
-def negate(subphi):
-    """negates the input subformula phi of type string. Either adds a not-parenthesis or removes a not-parenthesis.
-    negate("(p & not(p))") -> not((p & not(p))), not(p & not(p))
-    negate("p & not(p)") -> not(p & not(p))
-    negate("not(p) & not(q)") -> not(not(p) & not(q))"""
-    if subphi.startswith('not(') and subphi.endswith(')') and len(first_parenthesised_subformula(subphi)) == 1:
-        return subphi.removeprefix('not(').removesuffix(')')
-    else:
-        return 'not(' + subphi + ')'
+    __slots__ = ('worlds', 'worlds_sat', 'worlds_unsat', 'worlds_skipped', 'world_time_sat', 'world_time_unsat', 'propagations',
+                 'pure_literals', 'choice_points', 'branches_opened', 'branches_closed', 'backjumps', 'rule_and', 'rule_or', 'rule_box',
+                 'rule_dia', 'clashes', 'max_branch_depth', 'max_modal_depth', 'cache_hits', 'learned_clauses', 'store_hits',
+                 'semantic_lemmas', 'nogood_hits', 'blocked_worlds', 'size_before', 'size_after', 'stopped')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.stopped = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, counters):
+        """TableuxStats with the counters of the dict counters, e.g. from as_dict. counters that are missing stay 0."""
+        stats = cls()
+        for name in cls.__slots__:
+            if name in counters:
+                setattr(stats, name, counters[name])
+        return stats
+
+    def add(self, other):
+        """adds the counters of the TableuxStats other, the max_ counters take the larger value."""
+        for name in self.__slots__:
+            if name == 'stopped':
+                self.stopped = other.stopped or self.stopped
+            elif name.startswith('max_'):
+                setattr(self, name, max(getattr(self, name), getattr(other, name)))
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
 
-def parenthesised_formula(phi):
-    return phi.startswith('(') and phi.endswith(')') and (len(first_parenthesised_subformula(phi)) == 1)
 
 
+### budgets
 
-### apply tableux method to representation of parsed input formula string
+class _Unknown:
+    """type of the verdict UNKNOWN, there is only the one instance. it has no truth value, so a caller that tests the verdict with if
+    before comparing it with UNKNOWN fails loudly instead of taking UNKNOWN for unsatisfiable."""
+    __slots__ = ()
 
-def tableux_method(repr):
-    """tableux representation is a list or tuple of lists or tuples and is binary since logical operators and and or are binary."""
-    assert type(repr) == list or type(repr) == tuple
+    def __repr__(self):
+        return 'UNKNOWN'
 
-    #print(repr)
+    def __bool__(self):
+        raise TypeError('the verdict UNKNOWN has no truth value, compare it with UNKNOWN first')
 
-    # initialisation
-    if type(repr) != list:
-        return tableux_method([repr])
-    
-    # empty list
-    elif not repr:
+    def __reduce__(self):
+        return 'UNKNOWN'
+
+UNKNOWN = _Unknown()
+
+
+class BudgetExceeded(Exception):
+    """raised by Budget.check, TableuxEngine.solve turns it into the verdict UNKNOWN. reason is 'cancelled', 'deadline', 'max_nodes' or
+    'max_memory'."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """stops the runs it is passed to from any thread, they return UNKNOWN at their next check. a token stays cancelled."""
+    __slots__ = ('_event',)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class Budget:
+    """resource limits of a run of TableuxEngine, checked whenever a world or a branch is opened.
+        deadline    time.monotonic() by which the run has to be finished, None for no limit
+        max_nodes   most tableau nodes of the run after its root world, worlds and branches, None for no limit. max_nodes=0 lets the
+                    run decide the root world by propositional reasoning without a choice point or a successor world
+        max_memory  most resident memory of the process in bytes, checked at every 256th check, None for no limit
+        cancel      CancellationToken or None
+        nodes       nodes counted in the TableuxStats of the run when the budget was created, plus the root world. the stats may be
+                    shared by several runs, only the difference counts against max_nodes
+    """
+    __slots__ = ('deadline', 'max_nodes', 'max_memory', 'cancel', 'checks', 'nodes')
+
+    def __init__(self, deadline=None, max_nodes=None, max_memory=None, cancel=None, stats=None):
+        """stats is the TableuxStats the run counts into, None for new ones."""
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.cancel = cancel
+        self.checks = 0
+        self.nodes = 1 if stats is None else stats.worlds + stats.branches_opened + 1
+
+    def check(self, stats):
+        """raises BudgetExceeded if a limit is reached."""
+        if self.cancel is not None and self.cancel.cancelled:
+            raise BudgetExceeded('cancelled')
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded('deadline')
+        if self.max_nodes is not None and stats.worlds + stats.branches_opened - self.nodes > self.max_nodes:
+            raise BudgetExceeded('max_nodes')
+        if self.max_memory is not None:
+            self.checks += 1
+            if self.checks & 255 == 1 and _memory_usage() > self.max_memory:
+                raise BudgetExceeded('max_memory')
+
+    def limits(self, stats):
+        """(deadline, max_nodes, max_memory) of a task the run hands to a worker process: the same deadline and memory limit and the nodes
+        left to the run. the worker counts its nodes on its own, they are not added to the ones of the run."""
+        max_nodes = self.max_nodes
+        if max_nodes is not None:
+            max_nodes = max(0, max_nodes - (stats.worlds + stats.branches_opened - self.nodes))
+        return self.deadline, max_nodes, self.max_memory
+
+
+def _memory_usage():
+    """resident set size of the process in bytes, 0 where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+
+### hooks
+
+class TableuxHooks:
+    """callbacks of TableuxEngine, pass a subclass to tableux_method that overrides the events of interest. without hooks the engine
+    makes no calls at all.
+        rule(world, phi)                a rule is applied to phi, the rule of phi.op, literals by the clash rule
+        branch(world, phi, disjunct)    a branch of the or-node phi is opened with disjunct, the first or the second one
+        clash(world, conflict)          the branch is closed by a clash with dependency set conflict
+        decided(world, verdict)         world is found satisfiable or unsatisfiable
+    world.depth is the modal depth of the world, world.base + len(world.choices) the number of open choice points."""
+
+    def rule(self, world, phi):
+        pass
+
+    def branch(self, world, phi, disjunct):
+        pass
+
+    def clash(self, world, conflict):
+        pass
+
+    def decided(self, world, verdict):
+        pass
+
+
+class TraceHooks(TableuxHooks):
+    """writes every every-th event to file as a JSON line, a sampled trace of the run.
+        {"event": number of the event, "kind": "rule", "branch", "clash" or "decided", "modal_depth": .., "branch_depth": ..,
+         "formula": formula_string of the formula, cut after limit characters, "verdict": .. for decided events}"""
+
+    def __init__(self, file, every=1000, limit=80):
+        self.file = file
+        self.every = every
+        self.limit = limit
+        self.events = 0
+
+    def sample(self, kind, world, phi=None, **fields):
+        self.events += 1
+        if self.events % self.every:
+            return
+        record = {'event': self.events, 'kind': kind, 'modal_depth': world.depth, 'branch_depth': world.base + len(world.choices)}
+        if phi is not None:
+            record['formula'] = formula_string(phi)[:self.limit]
+        record.update(fields)
+        self.file.write(json.dumps(record) + '\n')
+
+    def rule(self, world, phi):
+        self.sample('rule', world, phi)
+
+    def branch(self, world, phi, disjunct):
+        self.sample('branch', world, disjunct)
+
+    def clash(self, world, conflict):
+        self.sample('clash', world)
+
+    def decided(self, world, verdict):
+        self.sample('decided', world, verdict=verdict)
+
+
+
+### apply tableux method to representation of parsed input formula string
+
+"""
+    branching heuristics, which open or-node World.select branches on
+        order       first or-node in the order they were reached, first disjunct first
+        moms        maximum occurrences in minimum size: among the smallest or-nodes, the disjunct occurring in most of them first
+        smallest    or-node with the smallest disjunct, that disjunct first
+        modal       or-node of the lowest modal depth, the disjunct of lower modal depth first, so that clashes are found before
+                    successor worlds are opened
+"""
+BRANCHING_HEURISTICS = ('order', 'moms', 'smallest', 'modal')
+
+class World:
+    """one world of the tableux on the explicit stack of TableuxEngine.
+    all branches of the world share one trail of formulas. the formulas from head onwards are not expanded yet.
+    an or-node is only branched on once the trail is expanded and propagation (unit and pure literal rule) asserts nothing more.
+    each choice point records the lengths of the trail and of the lists below, so backtracking truncates them instead of copying the
+    branch. memory is linear in the length of the current branch.
+    every formula on the branch carries its dependency set, an int with one bit per choice point it depends on. choice points are numbered
+    across the stack of worlds, base is the number of choice points open in the worlds below. a clash depends on the union of the dependency
+    sets of the clashing formulas, backtrack jumps over choice points that are not in it (dependency-directed backjumping).
+    with label bits each label gets a bit of its own as well, so the conflict of a closed world tells which labels the clash stems from
+    (its core, see NogoodStore). the label bits of a world come right before the bits of its choice points.
+        labels      formulas the world was created with
+        label_bit   bit of the first label, None if the labels have no bits of their own
+        first_bit   bit of the first choice point of the world
+        trail       formulas on the current branch, in the order they were added
+        present     maps the formulas on the trail to their dependency sets
+        index       LiteralIndex of the branch
+        ors         or-nodes reached on the branch, the ones from or_head onwards are not expanded yet
+        watches     maps the complement of each disjunct of the or-nodes reached in the world to these or-nodes, a dict used as an
+                    ordered set. it only grows, an or-node that is no longer on the branch is skipped
+        units       or-nodes to check by the unit rule, the ones reached since the last check and the ones watching a formula pushed
+                    since then. propagation is incremental this way, it does not rescan the open or-nodes before every choice point
+        occurring   or-nodes reached on the branch and the nodes below them at modal depth 0, for the pure literal rule. the nodes are
+                    logged in order, or_marks gives the log length before each or-node, so undo drops the nodes of removed or-nodes
+        pures       or-nodes reached since the last application of the pure literal rule that have a literal disjunct
+        modal       box- and dia-nodes reached on the branch
+        choices     open choice points, lists [trail length, head, LiteralIndex state, ors length, or_head, modal length, second disjunct,
+                    dependency set of the or-node, future of the second branch if it was handed to a worker process, or-node]
+        successors  label lists of the successor worlds once the branch is saturated, next the one to solve next
+        futures     maps the indices of successors handed to a worker process to their futures
+        fork        None, or a callable fork(world, phi, second) returning a future for the branch of the disjunct second of the
+                    or-node phi or None
+        conflict    dependency set of the last clash once no branch of the world is left open
+        origin      dependency set of the dia-node that opened the world
+        started     time.perf_counter() when the world was created
+        stats       TableuxStats the world counts into
+        heuristic   branching heuristic, one of BRANCHING_HEURISTICS
+        hooks       TableuxHooks to call, None for none
+        depth       modal depth of the world, the number of worlds below it on the stack
+        budget      Budget to check when a branch is opened, None for none
+        pure_rule   whether the pure literal rule is applied. a pure literal stops being pure once formulas are added to the world,
+                    SolverWorld turns the rule off
+        semantic    semantic branching: the second branch of an or-node a|b gets not(a) besides b. the complement of the refuted first
+                    disjunct depends on the clash only, like the second disjunct without the choice point, and stays on the branch as a
+                    lemma until a choice point in its dependency set is undone, so the second branch does not search through a again
+        reflexive   whether the box rule also applies to the world itself (T axiom): a box-node adds its formula to the branch
+        loop        modal depth of the shallowest world on the stack that a blocked successor in the subtree of the world was reused for,
+                    None if there is none. the world is only satisfiable on the condition that this ancestor is, see ModalLogic
+    """
+    __slots__ = ('labels', 'base', 'label_bit', 'first_bit', 'trail', 'head', 'present', 'index', 'ors', 'or_head', 'watches', 'units',
+                 'occurring', 'occurring_log', 'or_marks', 'pures', 'modal', 'choices',
+                 'successors', 'next', 'conflict', 'origin', 'futures', 'fork', 'started', 'stats', 'heuristic', 'hooks', 'depth', 'budget',
+                 'pure_rule', 'semantic', 'reflexive', 'loop')
+
+    def __init__(self, labels, base=0, deps=None, stats=None, label_bit=None):
+        """deps gives the dependency set of each label, all labels are independent of any choice by default. label_bit is the bit of
+        the first label if the labels get bits of their own."""
+        self.labels = labels
+        self.base = base
+        self.label_bit = label_bit
+        self.first_bit = base if label_bit is None else label_bit + len(labels)
+        self.trail = []
+        self.head = 0
+        self.present = {}
+        self.index = LiteralIndex()
+        self.ors = []
+        self.or_head = 0
+        self.watches = {}
+        self.units = []
+        self.occurring = set()
+        self.occurring_log = []
+        self.or_marks = []
+        self.pures = []
+        self.modal = []
+        self.choices = []
+        self.successors = None
+        self.next = 0
+        self.conflict = 0
+        self.origin = 0
+        self.futures = {}
+        self.fork = None
+        self.started = time.perf_counter()
+        self.stats = TableuxStats() if stats is None else stats
+        self.heuristic = 'order'
+        self.hooks = None
+        self.depth = 0
+        self.budget = None
+        self.pure_rule = True
+        self.semantic = False
+        self.reflexive = False
+        self.loop = None
+        for i, phi in enumerate(labels):
+            self.push(phi, (0 if deps is None else deps[i]) | (0 if label_bit is None else 1 << (label_bit + i)))
+
+    def push(self, phi, deps):
+        """adds phi to the branch unless it is already on it."""
+        if phi not in self.present:
+            self.present[phi] = deps
+            self.trail.append(phi)
+            watching = self.watches.get(phi)
+            if watching is not None:
+                self.units.extend(watching)
+
+    def choose(self, phi, first):
+        """opens a choice point for the or-node phi and continues with its disjunct first."""
+        deps = self.present[phi]
+        second = phi.args[1] if first is phi.args[0] else phi.args[0]
+        future = None if self.fork is None else self.fork(self, phi, second)
+        self.choices.append([len(self.trail), self.head, self.index.state(), len(self.ors), self.or_head, len(self.modal), second, deps,
+                             future, phi])
+        self.push(first, deps | 1 << (self.first_bit + len(self.choices) - 1))
+        stats = self.stats
+        stats.choice_points += 1
+        stats.branches_opened += 1
+        if self.base + len(self.choices) > stats.max_branch_depth:
+            stats.max_branch_depth = self.base + len(self.choices)
+        if self.hooks is not None:
+            self.hooks.branch(self, phi, first)
+        if self.budget is not None:
+            self.budget.check(stats)
+
+    def select(self):
+        """or-node to branch on and the disjunct to try first, chosen by the branching heuristic among the open or-nodes."""
+        present = self.present
+        if self.heuristic == 'order':
+            phi = self.ors[self.or_head]
+            return phi, phi.args[0]
+        pending = [phi for phi in self.ors[self.or_head:] if phi.args[0] not in present and phi.args[1] not in present]
+        if self.heuristic == 'moms':
+            smallest = min([phi.size for phi in pending])
+            pending = [phi for phi in pending if phi.size == smallest]
+            occurrences = {}
+            for phi in pending:
+                for disjunct in phi.args:
+                    occurrences[disjunct] = occurrences.get(disjunct, 0) + 1
+            first = max(occurrences, key=occurrences.get)
+            for phi in pending:
+                if first in phi.args:
+                    return phi, first
+        elif self.heuristic == 'smallest':
+            phi = min(pending, key=lambda phi: min(phi.args[0].size, phi.args[1].size))
+            return phi, min(phi.args, key=lambda disjunct: disjunct.size)
+        elif self.heuristic == 'modal':
+            phi = min(pending, key=lambda phi: phi.depth)
+            return phi, min(phi.args, key=lambda disjunct: disjunct.depth)
+        raise ValueError('unknown branching heuristic ' + repr(self.heuristic))
+
+    def undo(self, choice):
+        """restores the branch to the state the choice point was opened in, i.e. right after its or-node was taken."""
+        trail_length, self.head, index_state, ors_length, self.or_head, modal_length = choice[:6]
+        for phi in self.trail[trail_length:]:
+            del self.present[phi]
+        del self.trail[trail_length:]
+        self.index.restore(index_state)
+        if ors_length < len(self.ors):
+            mark = self.or_marks[ors_length]
+            for phi in self.occurring_log[mark:]:
+                self.occurring.discard(phi)
+            del self.occurring_log[mark:]
+            del self.or_marks[ors_length:]
+            del self.ors[ors_length:]
+        del self.units[:]
+        del self.pures[:]
+        del self.modal[modal_length:]
+        self.successors = None
+        self.next = 0
+        for future in self.futures.values():
+            future.cancel()
+        self.futures = {}
+
+    def backtrack(self, conflict):
+        """closes the current branch because of a clash with dependency set conflict. continues with the second disjunct of the latest
+        choice point in conflict, later choice points did not cause the clash and are skipped. returns False if no branch of the world is
+        left open, conflict then only refers to choice points of the worlds below."""
+        self.stats.branches_closed += 1
+        while self.choices:
+            choice = self.choices[-1]
+            self.undo(choice)
+            bit = 1 << (self.first_bit + len(self.choices) - 1)
+            if conflict & bit and choice[8] is not None:
+                future, choice[6], choice[8] = choice[8], None, None
+                _await_tasks([future], self.budget, self.stats)
+                if _task_verdict(future):
+                    self.proven()
+                    return True
+                # the worker refuted the second branch from all formulas on the branch
+                conflict = bit - 1
+            elif conflict & bit and choice[6] is not None:
+                # the second branch depends on whatever closed the first one
+                disjunct, choice[6] = choice[6], None
+                if self.semantic:
+                    first = choice[9].args[1] if disjunct is choice[9].args[0] else choice[9].args[0]
+                    self.push(negation(first), conflict & ~bit)
+                    self.stats.semantic_lemmas += 1
+                self.push(disjunct, choice[7] | (conflict & ~bit))
+                self.stats.branches_opened += 1
+                if self.hooks is not None:
+                    self.hooks.branch(self, choice[9], disjunct)
+                if self.budget is not None:
+                    self.budget.check(self.stats)
+                return True
+            elif choice[8] is not None:
+                choice[8].cancel()
+            if choice[6] is not None:
+                self.stats.backjumps += 1
+            self.choices.pop()
+        self.conflict = conflict
         return False
 
-    new_repr_1 = []
-    new_repr_2 = []
-
-    boxes = False
-
-    for i in range(len(repr)):
-        clause = repr[i]
-        # literal
-        if type(clause) == str:
-            new_repr_1.append(clause)
-        # one element list is a literal
-        elif type(clause) == list and len(clause) == 1:
-            assert type(clause[0]) == str
-            new_repr_1.append(clause[0])
-        elif type(clause) == list and len(clause) == 2:
-            new_repr_1.append(clause[0])
-            new_repr_1.append(clause[1])
-            return tableux_method(new_repr_1 + repr[i+1:])
-        
-        elif type(clause) == tuple:
-            #assert len(clause) == 2
-
-            if len(clause) == 3:
-                new_repr_2 = new_repr_1.copy()
-                new_repr_1.append(clause[1])
-                new_repr_2.append(clause[2])
-                branch_1 = tableux_method(new_repr_1 + repr[i+1:])
-                #print(branch_1)
-                if branch_1:
-                    return branch_1
+    def proven(self):
+        """a worker process found an open branch, expand then reports the world saturated without successors."""
+        self.head = len(self.trail)
+        self.or_head = len(self.ors)
+        del self.modal[:]
+
+    def cancel(self):
+        """cancels the tasks of the world that have not been started by a worker process yet."""
+        for future in self.futures.values():
+            future.cancel()
+        for choice in self.choices:
+            if choice[8] is not None:
+                choice[8].cancel()
+
+    def expand(self):
+        """applies the and-, or- and clash rules until the branch is propositionally saturated (True) or every branch is closed (False)."""
+        trail = self.trail
+        present = self.present
+        hooks = self.hooks
+        # rule counters are kept in locals and added to the stats on return
+        ands = ors_reached = 0
+        try:
+            while True:
+                if self.head < len(trail):
+                    phi = trail[self.head]
+                    self.head += 1
+                    op = phi.op
+                    if hooks is not None:
+                        hooks.rule(self, phi)
+                    # literal, top or bottom, clash rule
+                    if op == 'atom' or op == 'not' or op == 'T' or op == 'F':
+                        if not self.index.add(phi):
+                            if not self.clash(present[phi] | present.get(negation(phi), 0)):
+                                return False
+                    elif op == 'and':
+                        ands += 1
+                        deps = present[phi]
+                        self.push(phi.args[0], deps)
+                        self.push(phi.args[1], deps)
+                    elif op == 'or':
+                        ors_reached += 1
+                        self.reach(phi)
+                    else:
+                        self.modal.append(phi)
+                        if op == 'box' and self.reflexive:
+                            self.push(phi.args[0], present[phi])
                 else:
-                    return tableux_method(new_repr_2 + repr[i+1:])
-            else:
-                assert len(clause) == 1 or len(clause) == 2
-                boxes = True
-                new_repr_1.append(clause)
-    
-    assert new_repr_2 == []
-    
-    
-    # clashes
-    for expr in new_repr_1:
-        if type(expr) == str:
-            if expr == 'F':
+                    ors = self.ors
+                    while self.or_head < len(ors) and (ors[self.or_head].args[0] in present or ors[self.or_head].args[1] in present):
+                        self.or_head += 1
+                    if self.or_head == len(ors):
+                        return True
+                    conflict = self.propagate()
+                    if conflict is not None:
+                        if not self.clash(conflict):
+                            return False
+                    elif len(trail) == self.head and not (self.pure_rule and self.pure_literals()):
+                        self.choose(*self.select())
+        finally:
+            self.stats.rule_and += ands
+            self.stats.rule_or += ors_reached
+
+    def clash(self, conflict):
+        """closes the current branch by the clash rule, see backtrack."""
+        self.stats.clashes += 1
+        if self.hooks is not None:
+            self.hooks.clash(self, conflict)
+        return self.backtrack(conflict)
+
+    def reach(self, phi):
+        """adds the or-node phi to the open or-nodes of the branch, to the watches on the complements of its disjuncts if it is new to the
+        world, and to the or-nodes to check by the unit rule and the pure literal rule."""
+        self.or_marks.append(len(self.occurring_log))
+        self.ors.append(phi)
+        watches = self.watches
+        for disjunct in phi.args:
+            # complements of literals are cheap to build, other disjuncts are only watched if their complement exists already
+            complement = negation(disjunct) if disjunct.op == 'atom' else disjunct._neg
+            if complement is not None:
+                watching = watches.get(complement)
+                if watching is None:
+                    watches[complement] = {phi: None}
+                else:
+                    watching[phi] = None
+        self.units.append(phi)
+        if not self.pure_rule:
+            return
+        occurring = self.occurring
+        log = self.occurring_log
+        stack = [phi]
+        while stack:
+            node = stack.pop()
+            if node in occurring:
+                continue
+            occurring.add(node)
+            log.append(node)
+            if node.op == 'and' or node.op == 'or':
+                stack.extend(node.args)
+            elif node.op == 'box' and self.reflexive:
+                stack.append(node.args[0])
+        first, second = phi.args
+        if first is TOP or first.op == 'atom' or first.op == 'not' or second is TOP or second.op == 'atom' or second.op == 'not':
+            self.pures.append(phi)
+
+    def refuted(self, phi):
+        """dependency set of the complement of phi if it is on the branch, None if phi is not refuted by the branch."""
+        if phi is BOTTOM:
+            return 0
+        if phi._neg is not None:
+            return self.present.get(phi._neg)
+        return None
+
+    def propagate(self):
+        """unit rule: asserts the other disjunct of every open or-node with a refuted disjunct, without a choice point. only the or-nodes
+        in units are checked, the others have not changed since their last check.
+        returns the dependency set of the clash if both disjuncts of an or-node are refuted, otherwise None."""
+        present = self.present
+        units = self.units
+        while units:
+            phi = units.pop()
+            first, second = phi.args
+            if phi not in present or first in present or second in present:
+                continue
+            first_refuted = self.refuted(first)
+            second_refuted = self.refuted(second)
+            if first_refuted is not None:
+                if second_refuted is not None:
+                    return present[phi] | first_refuted | second_refuted
+                self.push(second, present[phi] | first_refuted)
+                self.stats.propagations += 1
+            elif second_refuted is not None:
+                self.push(first, present[phi] | second_refuted)
+                self.stats.propagations += 1
+        return None
+
+    def pure_literals(self):
+        """pure literal rule: a disjunct of an open or-node that is a literal whose complement neither is on the branch nor occurs in an
+        or-node reached on the branch can be asserted without a choice point, it cannot take part in a clash in this world. returns True if
+        it asserted one. in a reflexive world the formulas of box-nodes end up on the branch too, so the literals below them occur as well.
+        along a branch formulas are only added, so a literal that is not pure stays so: only the or-nodes in pures are checked, once."""
+        present = self.present
+        occurring = self.occurring
+        asserted = False
+        pures = self.pures
+        while pures:
+            phi = pures.pop()
+            if phi not in present or phi.args[0] in present or phi.args[1] in present:
+                continue
+            for disjunct in phi.args:
+                if disjunct is TOP or (disjunct.op == 'atom' or disjunct.op == 'not') and disjunct._neg not in occurring \
+                        and disjunct._neg not in present:
+                    if disjunct not in present:
+                        self.push(disjunct, present[phi])
+                        self.stats.pure_literals += 1
+                        asserted = True
+                    break
+        return asserted
+
+    def successor(self, labels):
+        """new world for the successor label list labels of the saturated branch. a label depends on the box- and dia-nodes it stems from,
+        a box-node carried over by a transitive logic on itself, the world as a whole on the dia-node that opened it, whose formula is the
+        last label."""
+        deps = {}
+        origin = 0
+        for phi in self.modal:
+            deps[phi.args[0]] = deps.get(phi.args[0], 0) | self.present[phi]
+            if phi.op == 'box':
+                deps[phi] = deps.get(phi, 0) | self.present[phi]
+            if phi.op == 'dia' and phi.args[0] is labels[-1]:
+                origin |= self.present[phi]
+        world = World(labels, self.base + len(self.choices), [deps[phi] for phi in labels], self.stats,
+                      None if self.label_bit is None else self.first_bit + len(self.choices))
+        world.origin = origin
+        world.heuristic = self.heuristic
+        world.hooks = self.hooks
+        world.depth = self.depth + 1
+        world.budget = self.budget
+        return world
+
+    def core(self):
+        """labels that the clashes of the closed world depend on, the ones whose bits are in conflict. needs label bits."""
+        return [phi for i, phi in enumerate(self.labels) if self.conflict >> (self.label_bit + i) & 1]
+
+    def parent_conflict(self, conflict=None):
+        """dependency set to close the branch of the world below with, by default the one of the closed world and of its origin. the bits
+        of the world's own labels and choice points are dropped, the dependency sets of the labels in the world below take their place."""
+        conflict = self.conflict | self.origin if conflict is None else conflict
+        return conflict if self.label_bit is None else conflict & ((1 << self.label_bit) - 1)
+
+
+class TableuxEngine:
+    """iterative tableux method. the worlds under consideration are kept on an explicit stack, a world is pushed when a successor world
+    has to be solved and popped with its verdict, so neither deep formulas nor a high modal depth lead to a RecursionError.
+    an unsatisfiable successor closes the branch of its parent with the dependency set of its own clashes.
+    successors are solved cheapest and most likely unsatisfiable first (order_worlds), the first unsatisfiable one closes the branch
+    without solving its siblings.
+    with an executor, successor worlds and second branches of or-nodes of at least threshold size are handed to worker processes,
+    at most max_tasks at a time. their engines branch by the same heuristic and options, with nogoods they use a NogoodStore of the
+    worker process. the engine goes on with the rest meanwhile and waits for a task only once its result is needed. the tasks
+    get the limits of the budget, and the budget is checked while the engine waits. with a WorkerPool executor the tasks of a run also
+    stop once the run ends, e.g. because it was cancelled.
+    the counters of the run go into stats, hooks is an optional TableuxHooks that is called on every rule application and branch.
+    once a limit of the optional Budget budget is reached, solve stops with the verdict UNKNOWN and the reason in stats.stopped.
+    semantic turns on semantic branching in the worlds of the engine, see World.
+    nogoods is an optional NogoodStore. the worlds then give their labels bits of their own, the core of every unsatisfiable world goes
+    into the store and a world that contains a stored nogood is closed without expanding it.
+    logic is the ModalLogic of the frames, or the name of one of LOGICS. while a world is on the stack, the label_key of its labels maps to
+    its modal depth in ancestors, so a successor of a transitive logic is blocked by a hash lookup."""
+
+    def __init__(self, cache=world_cache, executor=None, threshold=256, max_tasks=None, order_worlds=True, stats=None, heuristic='order',
+                 hooks=None, budget=None, semantic=False, nogoods=None, logic='K'):
+        if heuristic not in BRANCHING_HEURISTICS:
+            raise ValueError('unknown branching heuristic ' + repr(heuristic))
+        if type(logic) == str:
+            if logic not in LOGICS:
+                raise ValueError('unknown modal logic ' + repr(logic))
+            logic = LOGICS[logic]
+        self.cache = cache
+        self.executor = executor
+        self.threshold = threshold
+        self.max_tasks = max_tasks or os.cpu_count() or 1
+        self.tasks = set()
+        self.order_worlds = order_worlds
+        self.stats = TableuxStats() if stats is None else stats
+        self.heuristic = heuristic
+        self.hooks = hooks
+        self.budget = budget
+        self.semantic = semantic
+        self.nogoods = nogoods
+        self.logic = logic
+        self.ancestors = {}
+        # number of the current run of a WorkerPool, shared with its worker processes
+        self.run = executor.run if isinstance(executor, WorkerPool) else None
+        # options of the engines that solve the tasks in the worker processes, hooks stay with this engine
+        self.task_options = {'order_worlds': order_worlds, 'heuristic': heuristic, 'semantic': semantic, 'nogoods': nogoods is not None,
+                             'logic': logic}
+
+    def key(self, labels):
+        """key of the label list labels in the world cache, verdicts of different logics are kept apart."""
+        key = self.cache.key(labels)
+        return key + self.logic.tag if self.logic.tag else key
+
+    def solve(self, labels, root=None):
+        """satisfiability of a world with the given list of labels, True, False or UNKNOWN if the budget ran out.
+        root is an existing World with these labels to continue the search of instead of a new one, see Solver."""
+        worlds = []
+        # verdict of the world popped last, None while the world on top is still open
+        verdict = None
+        try:
+            if root is None and self.nogoods is not None and self.nogoods.find(labels, self.logic.tag) is not None:
+                self.stats.nogood_hits += 1
                 return False
-            #assert re.fullmatch(r'[a-z]+[0-9]*', expr.removeprefix('not(').removesuffix(')'))
-            if expr.startswith('not(') and expr.endswith(')'):
-                if expr.removeprefix('not(').removesuffix(')') in new_repr_1:
-                    return False
-                elif negate(expr) in new_repr_1:
+            worlds.append(self.world(labels) if root is None else self.attach(root))
+            if self.logic.transitive:
+                self.ancestors[label_key(worlds[0].labels)] = worlds[0].depth
+            while True:
+                world = worlds[-1]
+                if verdict is None:
+                    verdict = self.schedule(world, worlds)
+                    if verdict is None:
+                        continue
+                # world on top is decided, a satisfiable one that relies on a world below for a blocked successor is not cached
+                conditional = verdict and world.loop is not None and world.loop < world.depth
+                if self.cache is not None and not conditional:
+                    self.cache.put(self.key(world.labels), verdict)
+                if not verdict and self.nogoods is not None and world.label_bit is not None:
+                    self.nogoods.add(world.core(), self.logic.tag)
+                worlds.pop()
+                world.cancel()
+                if self.logic.transitive:
+                    del self.ancestors[label_key(world.labels)]
+                self.record(world, verdict)
+                if not worlds:
+                    return verdict
+                parent = worlds[-1]
+                if verdict:
+                    if conditional and (parent.loop is None or world.loop < parent.loop):
+                        parent.loop = world.loop
+                    parent.next += 1
+                    verdict = None
+                elif self.close(parent, world.parent_conflict()):
+                    verdict = None
+                # else parent is unsatisfiable as well
+        except BudgetExceeded as error:
+            self.stats.stopped = error.reason
+            return UNKNOWN
+        finally:
+            for world in worlds:
+                world.cancel()
+            self.ancestors.clear()
+            if self.run is not None:
+                # the tasks of this run that are still running stop at their next budget check
+                self.run.value += 1
+
+    def world(self, labels, parent=None):
+        """new world with the given labels, a successor of the saturated branch of parent if given."""
+        if parent is not None:
+            return self.attach(parent.successor(labels))
+        return self.attach(World(labels, stats=self.stats, label_bit=None if self.nogoods is None else 0))
+
+    def attach(self, world):
+        """lets the engine drive world with its stats, heuristic, hooks, budget, branching and worker processes."""
+        world.stats = self.stats
+        world.started = time.perf_counter()
+        world.heuristic = self.heuristic
+        world.hooks = self.hooks
+        world.budget = self.budget
+        world.semantic = self.semantic
+        world.reflexive = self.logic.reflexive
+        if self.executor is not None:
+            world.fork = self.fork
+        self.stats.worlds += 1
+        if world.depth > self.stats.max_modal_depth:
+            self.stats.max_modal_depth = world.depth
+        if self.budget is not None:
+            self.budget.check(self.stats)
+        return world
+
+    def record(self, world, verdict):
+        if self.hooks is not None:
+            self.hooks.decided(world, verdict)
+        elapsed = time.perf_counter() - world.started
+        if verdict:
+            self.stats.worlds_sat += 1
+            self.stats.world_time_sat += elapsed
+        else:
+            self.stats.worlds_unsat += 1
+            self.stats.world_time_unsat += elapsed
+
+    def close(self, world, conflict):
+        """closes the branch of world because its successor world.next is unsatisfiable, see World.backtrack."""
+        self.stats.worlds_skipped += len(world.successors) - world.next - 1
+        return world.backtrack(conflict)
+
+    def order(self, successors):
+        """sorts the successor label lists so that the ones most likely to fail come first: cached unsatisfiable, then the ones containing
+        a formula and its complement, then by total size. cached satisfiable successors cost nothing and go last."""
+        def cost(labels):
+            cached = None if self.cache is None else self.cache.peek(self.key(labels))
+            if cached is not None:
+                return (0 if not cached else 3, 0)
+            members = set(labels)
+            if any(phi._neg in members for phi in labels if phi._neg is not None):
+                return (1, 0)
+            return (2, sum([phi.size for phi in labels]))
+        successors.sort(key=cost)
+
+    def schedule(self, world, worlds):
+        """expands world and solves the successor worlds of its saturated branch one after the other. a successor that is not cached is
+        pushed on the stack and None returned. returns the verdict of world once it has been decided."""
+        while True:
+            if world.successors is None:
+                if not world.expand():
                     return False
-                else:
+                world.successors = self.logic.successors(world.modal)
+                if self.order_worlds and len(world.successors) > 1:
+                    self.order(world.successors)
+                if self.executor is not None:
+                    self.offload(world)
+            conflict = None
+            while world.next < len(world.successors):
+                labels = world.successors[world.next]
+                self.stats.rule_dia += 1
+                self.stats.rule_box += len(labels) - 1
+                if world.next in world.futures:
+                    world.next += 1
                     continue
-                    
-
+                cached = None if self.cache is None else self.cache.get(self.key(labels))
+                if cached is None:
+                    core = None if self.nogoods is None else self.nogoods.find(labels, self.logic.tag)
+                    if core is None:
+                        if self.logic.transitive:
+                            key = label_key(labels)
+                            depth = self.ancestors.get(key)
+                            if depth is not None:
+                                # the ancestor with the same labels is the witness of the successor
+                                self.stats.blocked_worlds += 1
+                                if world.loop is None or depth < world.loop:
+                                    world.loop = depth
+                                world.next += 1
+                                continue
+                            self.ancestors[key] = world.depth + 1
+                        worlds.append(self.world(labels, world))
+                        return None
+                    self.stats.nogood_hits += 1
+                    conflict = self.unsat_successor(world, labels, core)
+                    break
+                self.stats.cache_hits += 1
+                if not cached:
+                    conflict = self.unsat_successor(world, labels)
+                    break
+                world.next += 1
+            if conflict is None and world.futures:
+                conflict = self.collect(world)
+            if conflict is None:
+                return True
+            if not self.close(world, conflict):
+                return False
 
-    # propositionally saturated and some boxes
-    if boxes:
-        and_node = apply_box_rule(new_repr_1)
-        assert len(and_node) >= 1
-        if not and_node[0]:
-            return True
-        else:
-            if len(and_node) == 1:
-                return tableux_method(and_node[0])
+    def unsat_successor(self, world, labels, core=None):
+        """dependency set of an unsatisfiable successor of world that was not expanded here. it depends on the labels in core, a nogood,
+        or on all of its labels."""
+        successor = world.successor(labels)
+        conflict = successor.origin
+        for phi in successor.present if core is None else core:
+            conflict |= successor.present[phi]
+        return successor.parent_conflict(conflict)
+
+    ### worker processes
+
+    def offload(self, world):
+        """hands the uncached successors of world of at least threshold size to worker processes."""
+        for i, labels in enumerate(world.successors):
+            if len(self.tasks) >= self.max_tasks:
+                return
+            if sum([phi.size for phi in labels]) < self.threshold:
+                continue
+            if self.cache is not None and self.cache.get(self.key(labels)) is not None:
+                continue
+            world.futures[i] = self.submit(labels)
+
+    def fork(self, world, phi, second):
+        """hands the second branch of the or-node phi to a worker process, as a world with the formulas on the branch and the disjunct.
+        and-nodes that are expanded already are left out, their conjuncts are on the branch."""
+        if phi.size < self.threshold or len(self.tasks) >= self.max_tasks:
+            return None
+        trail = world.trail
+        return self.submit([psi for psi in trail[:world.head] if psi.op != 'and'] + trail[world.head:] + [second])
+
+    def submit(self, labels):
+        future = self.executor.submit(_solve_labels, labels, None if self.budget is None else self.budget.limits(self.stats),
+                                      self.task_options, None if self.run is None else self.run.value)
+        self.tasks.add(future)
+        future.add_done_callback(self.tasks.discard)
+        return future
+
+    def collect(self, world):
+        """waits for the successors of world handed to worker processes. returns None if all of them are satisfiable, otherwise the
+        dependency set of the first unsatisfiable one. its siblings are cancelled by backtrack."""
+        pending = {future: i for i, future in world.futures.items()}
+        while pending:
+            for future in _await_tasks(pending, self.budget, self.stats):
+                labels = world.successors[pending.pop(future)]
+                verdict = _task_verdict(future)
+                if self.cache is not None:
+                    self.cache.put(self.key(labels), verdict)
+                if not verdict:
+                    # for the count of skipped successors in close
+                    world.next = len(world.successors) - len(pending) - 1
+                    return self.unsat_successor(world, labels)
+        world.futures = {}
+        return None
+
+
+class KsatWorld:
+    """one world of KsatEngine. the labels are encoded into clauses of a CDCL core once, the models of the core are refined by clauses
+    that block combinations of box- and dia-nodes with an unsatisfiable successor world.
+        labels      formulas the world was created with
+        sat         CDCL core, variables maps the atoms, box-nodes and and-/or-nodes to its variables
+        boxes       box-nodes the current model needs, successors the label lists of its dia-nodes, next the one to solve next
+        depth       modal depth of the world
+    """
+    __slots__ = ('labels', 'sat', 'variables', 'boxes', 'successors', 'next', 'depth', 'started')
+    # the decision levels of the core are the choice points, as far as TableuxHooks are concerned
+    base = 0
+
+    @property
+    def choices(self):
+        return self.sat.trail_lim
+
+    def __init__(self, labels, depth=0):
+        self.labels = labels
+        self.sat = CDCL()
+        self.variables = {}
+        self.boxes = None
+        self.successors = None
+        self.next = 0
+        self.depth = depth
+        self.started = time.perf_counter()
+        self.encode()
+
+    def literal(self, phi):
+        """literal of the CDCL core for the atom, not-literal, box-, dia-, and- or or-node phi. a dia-node is the complement of a box-node,
+        and- and or-nodes get a definition variable."""
+        if phi.op == 'not':
+            return -self.literal(phi.args[0])
+        if phi.op == 'dia':
+            return -self.literal(negation(phi))
+        v = self.variables.get(phi)
+        if v is None:
+            v = self.variables[phi] = self.sat.new_var()
+        return v
+
+    def encode(self):
+        """clauses of the labels, plaisted-greenbaum encoding: a definition variable of an and- or or-node implies the node. chains of
+        and- resp. or-nodes are encoded as one n-ary node."""
+        sat = self.sat
+        # (definition literal or None for a label, node)
+        stack = [(None, phi) for phi in self.labels]
+        defined = set()
+        while stack:
+            head, phi = stack.pop()
+            if phi.op == 'and':
+                for operand in _operands(phi):
+                    stack.append((head, operand))
+                continue
+            if phi.op == 'or':
+                clause = [] if head is None else [-head]
+                for operand in _operands(phi):
+                    if operand is TOP:
+                        break
+                    if operand is not BOTTOM:
+                        clause.append(self.literal(operand))
+                        if (operand.op == 'and' or operand.op == 'or') and operand not in defined:
+                            defined.add(operand)
+                            stack.append((self.literal(operand), operand))
+                else:
+                    sat.add_clause(clause)
+                continue
+            if phi is TOP:
+                continue
+            if phi is BOTTOM:
+                sat.add_clause([] if head is None else [-head])
             else:
-                return reduce(lambda a, b: a and b, map(tableux_method, and_node))
-    
-    # only literals, leaf of tableux tree, apply axiom/clash rule
-    else:
-        return eval_lits(new_repr_1)
-
-        
-def eval_lits(repr):
-    if len(repr) == 1:
-        s = repr[0]
-        assert type(s) == str
-        if s == 'T':
-            return True
-        elif s == 'F':
-            return False
-        else:
-            return True
-    else:
-        for lit in repr:
-            if lit.startswith('not(') and lit.endswith(')'):
-                if lit.removeprefix('not(').removesuffix(')') in repr:
+                sat.add_clause([self.literal(phi)] if head is None else [-head, self.literal(phi)])
+
+    def true(self, phi):
+        """truth of the formula phi in the current model, and- and or-nodes by their definition variable."""
+        if phi is TOP or phi is BOTTOM:
+            return phi is TOP
+        return self.sat.value.get(self.literal(phi)) is True
+
+    def refine(self):
+        """box- and dia-nodes the current model needs to satisfy the labels. an or-node needs one true operand, a literal one if possible,
+        so the successors of the model are only the ones the labels ask for. sets boxes and successors."""
+        boxes = []
+        dias = []
+        seen = set()
+        stack = list(self.labels)
+        while stack:
+            phi = stack.pop()
+            if phi in seen:
+                continue
+            seen.add(phi)
+            if phi.op == 'and':
+                stack.extend(_operands(phi))
+            elif phi.op == 'or':
+                operands = [operand for operand in _operands(phi) if self.true(operand)]
+                literals = [operand for operand in operands if operand.op in ('T', 'atom', 'not')]
+                stack.append(literals[0] if literals else operands[0])
+            elif phi.op == 'box':
+                boxes.append(phi)
+            elif phi.op == 'dia':
+                dias.append(phi)
+        contents = [phi.args[0] for phi in boxes]
+        self.boxes = boxes
+        self.successors = [contents + [phi.args[0]] for phi in dias]
+        self.next = 0
+
+    def block(self, labels):
+        """adds the clause that forbids the boxes of the current model together with the dia-node of the unsatisfiable successor labels."""
+        self.sat.add_clause([-self.literal(phi) for phi in self.boxes] + [-self.literal(diamond(labels[-1]))])
+        self.successors = None
+
+
+class KsatEngine(TableuxEngine):
+    """KSAT engine, an alternative to the tableux method of TableuxEngine behind the same options. the propositional layer of each world,
+    with box- and dia-nodes as variables, is solved by the CDCL core of cdcl.py with clause learning. the modal rules only run on the
+    models it returns: a world is satisfiable if the successors of a model are, an unsatisfiable successor adds a blocking clause and the
+    core looks for the next model. worlds are solved on an explicit stack like in TableuxEngine.
+    the heuristic, hooks other than decided and worker processes of TableuxEngine do not apply."""
+
+    def solve(self, labels, root=None):
+        """satisfiability of a world with the given list of labels, True, False or UNKNOWN if the budget ran out."""
+        worlds = []
+        verdict = None
+        try:
+            worlds.append(self.ksat_world(labels, 0))
+            while True:
+                world = worlds[-1]
+                if verdict is None:
+                    verdict = self.schedule(world, worlds)
+                    if verdict is None:
+                        continue
+                if self.cache is not None:
+                    self.cache.put(self.cache.key(world.labels), verdict)
+                worlds.pop()
+                self.record(world, verdict)
+                if not worlds:
+                    return verdict
+                parent = worlds[-1]
+                if verdict:
+                    parent.next += 1
+                else:
+                    self.stats.branches_closed += 1
+                    self.stats.worlds_skipped += len(parent.successors) - parent.next - 1
+                    parent.block(world.labels)
+                verdict = None
+        except BudgetExceeded as error:
+            self.stats.stopped = error.reason
+            return UNKNOWN
+
+    def ksat_world(self, labels, depth):
+        world = KsatWorld(labels, depth)
+        self.stats.worlds += 1
+        if depth > self.stats.max_modal_depth:
+            self.stats.max_modal_depth = depth
+        if self.budget is not None:
+            self.budget.check(self.stats)
+        return world
+
+    def schedule(self, world, worlds):
+        """finds a model of world whose successors are satisfiable. a successor that is not cached is pushed on the stack and None
+        returned. returns the verdict of world once it has been decided."""
+        stats = self.stats
+        check = None if self.budget is None else lambda: self.budget.check(stats)
+        while True:
+            if world.successors is None:
+                sat = world.sat
+                counters = sat.decisions, sat.conflicts, sat.propagations, sat.learned
+                satisfiable = sat.solve(check)
+                stats.choice_points += sat.decisions - counters[0]
+                stats.clashes += sat.conflicts - counters[1]
+                stats.propagations += sat.propagations - counters[2]
+                stats.learned_clauses += sat.learned - counters[3]
+                if not satisfiable:
                     return False
+                stats.branches_opened += 1
+                world.refine()
+                if self.order_worlds and len(world.successors) > 1:
+                    self.order(world.successors)
+            while world.next < len(world.successors):
+                labels = world.successors[world.next]
+                stats.rule_dia += 1
+                stats.rule_box += len(labels) - 1
+                cached = None if self.cache is None else self.cache.get(self.cache.key(labels))
+                if cached is None:
+                    worlds.append(self.ksat_world(labels, world.depth + 1))
+                    return None
+                stats.cache_hits += 1
+                if not cached:
+                    stats.branches_closed += 1
+                    world.block(labels)
+                    break
+                world.next += 1
             else:
-                if 'not(' + lit + ')' in repr:
-                    return False
-        return True
+                return True
+
+
+### process pool
+
+# seconds between two budget checks while the engine waits for a worker process
+TASK_POLL = 0.05
+
+
+class WorkerPool(ProcessPoolExecutor):
+    """process pool of the parallel mode of TableuxEngine. the worker processes share the number of the current run with the engine, which
+    increases it once the run ends, so the tasks of a run that was cancelled, ran out of its budget or was decided stop at their next
+    budget check instead of keeping the workers busy. a pool serves one run at a time."""
+
+    def __init__(self, workers):
+        self.run = multiprocessing.RawValue('q', 0)
+        super().__init__(workers, initializer=_init_pool_worker, initargs=(self.run,))
+
+
+# number of the current run of the WorkerPool of a worker process, None in other processes
+_pool_run = None
+
+def _init_pool_worker(run):
+    global _pool_run
+    _pool_run = run
+
+
+class _RunToken:
+    """CancellationToken of a task in a worker process of a WorkerPool, cancelled once the run that submitted it has ended."""
+    __slots__ = ('run',)
+
+    def __init__(self, run):
+        self.run = run
+
+    @property
+    def cancelled(self):
+        return _pool_run.value != self.run
+
+
+# NogoodStore of a worker process, shared by the tasks of engines with nogoods
+_task_nogoods = None
+
+def _solve_labels(labels, limits=None, options=None, run=None):
+    """entry point of the worker processes, solves one world with the world cache of the worker process.
+    limits are the (deadline, max_nodes, max_memory) of the engine, see Budget.limits, options the TableuxEngine.task_options of the
+    engine and run the number of the WorkerPool run of the task.
+    output: (verdict, reason the budget stopped the task or None)"""
+    global _task_nogoods
+    options = dict(options or {})
+    if options.pop('nogoods', False):
+        if _task_nogoods is None:
+            _task_nogoods = NogoodStore()
+        options['nogoods'] = _task_nogoods
+    cancel = None if run is None or _pool_run is None else _RunToken(run)
+    budget = None
+    if limits is not None or cancel is not None:
+        budget = Budget(*(limits or (None, None, None)), cancel)
+    stats = TableuxStats()
+    verdict = TableuxEngine(world_cache, stats=stats, budget=budget, **options).solve(labels)
+    return verdict, stats.stopped
+
+
+def _await_tasks(futures, budget, stats):
+    """the futures of futures that are done, at least one. with a budget it waits TASK_POLL seconds at a time and checks the budget in
+    between, so a run that is cancelled or out of time stops while a worker process is still busy."""
+    while True:
+        done, _ = wait(futures, None if budget is None else TASK_POLL, FIRST_COMPLETED)
+        if done:
+            return done
+        budget.check(stats)
+
+
+def _task_verdict(future):
+    """verdict of a finished task of a worker process. raises BudgetExceeded with the reason of the worker if it ran out of its limits."""
+    verdict, stopped = future.result()
+    if verdict is UNKNOWN:
+        raise BudgetExceeded(stopped)
+    return verdict
+
+
+ENGINES = ('tableux', 'ksat')
+
+
+def tableux_method(repr, cache=world_cache, workers=None, executor=None, parallel_threshold=256, order_worlds=True, stats=None,
+                   heuristic='order', hooks=None, return_stats=False, timeout=None, max_nodes=None, max_memory=None, cancel=None,
+                   preprocess=False, engine='tableux', store=None, canonicalize=False, semantic=False, nogoods=None,
+                   logic='K'):
+    """tableux representation is a formula node or a list of formula nodes, the formulas of the initial world.
+    literals go into the LiteralIndex of the branch, and-nodes extend the branch, or-nodes split it,
+    box- and dia-nodes are handled by apply_box_rule, or the box rule of logic, once the branch is propositionally saturated.
+    worlds are looked up in the SatCache cache before they are expanded, cache=None solves every world from scratch.
+    parallel mode: successor worlds and or-branches of at least parallel_threshold size are solved by a process pool, either the given
+    concurrent.futures executor or a WorkerPool of workers processes created for this call. an unsatisfiable task cancels its siblings.
+    the tasks get the deadline, max_memory and the nodes left of max_nodes. cancel reaches them through a WorkerPool only, with other
+    executors the run still stops at once but tasks that have been started finish on their own.
+    successor worlds are solved in the order of TableuxEngine.order unless order_worlds is False.
+    stats is an optional TableuxStats that the counters of the run are added to.
+    heuristic selects the or-node to branch on, one of BRANCHING_HEURISTICS.
+    hooks is an optional TableuxHooks called on rule applications, branches and clashes, e.g. TraceHooks for a sampled trace.
+    budget: the run stops with the verdict UNKNOWN after timeout seconds of wall-clock time, more than max_nodes tableau nodes (worlds and
+    branches) after the root world, more than max_memory bytes of resident memory or once the CancellationToken cancel is cancelled, see
+    Budget.
+    the verdict is True, False or UNKNOWN, with return_stats the output is the pair (verdict, stats), a new TableuxStats if none is given.
+    stats.stopped tells which limit was reached.
+    with preprocess the formulas are reduced by simplify first, how much smaller they became is in stats.size_before and stats.size_after.
+    with canonicalize they are brought into their canonical form, so that
+    worlds whose formulas only differ by the order and grouping of conjunctions and disjunctions share one entry of the world cache.
+    engine is one of ENGINES: 'tableux' for the tableux method of TableuxEngine, 'ksat' for KsatEngine, which solves the propositional
+    layer of each world with the CDCL core of cdcl.py. ksat ignores heuristic, workers and executor.
+    semantic turns on semantic branching, the second branch of an or-node also gets the complement of the refuted first disjunct, see
+    World. ksat ignores it, its CDCL core branches on literals and learns from every conflict anyway.
+    nogoods is an optional NogoodStore of unsatisfiable label sets, pass the same one to several calls to share what they refuted. worlds
+    that contain a stored nogood are closed without expanding them and counted in stats.nogood_hits. ksat ignores it, the worker processes
+    learn into stores of their own.
+    logic is the modal logic, one of LOGICS or a ModalLogic: 'K' (the default), 'KT' (reflexive), 'K4' (transitive) or 'S4' (both).
+    transitive logics block successors by their ancestors, see ModalLogic. ksat only decides K.
+    store is an optional ResultStore that is consulted before solving. a stored verdict is returned with the counters of the run that
+    found it, which are added to stats, and counted in stats.store_hits. a new one is stored with the counters of its run. unless cache is
+    None, the world cache is then the StoredSatCache of the store, which keeps the verdicts of the worlds of the modal layer across runs
+    as well."""
+    assert type(repr) == list or type(repr) == Formula
 
+    # initialisation
+    if type(repr) != list:
+        repr = [repr]
+    if return_stats and stats is None:
+        stats = TableuxStats()
+    if type(logic) == str and logic not in LOGICS:
+        raise ValueError("unknown modal logic '" + logic + "'")
+    tag = (LOGICS[logic] if type(logic) == str else logic).tag
+    if engine == 'ksat' and tag:
+        raise ValueError('the ksat engine only decides K')
+    key = None
+    if store is not None and repr:
+        key = canonical_fingerprint(repr)
+        if tag:
+            key = blake2b(key + tag, digest_size=16).digest()
+        stored = store.get_formula(key)
+        if stored is not None:
+            if stats is not None:
+                stats.add(TableuxStats.from_dict(stored[1]))
+                stats.store_hits += 1
+            return (stored[0], stats) if return_stats else stored[0]
+        if cache is not None:
+            cache = store.cache
+        # the run counts into stats of its own, which are stored and then added to the given ones
+        given_stats, stats = stats, TableuxStats()
+    if preprocess:
+        simplified = [simplify(phi) for phi in repr]
+        if stats is not None:
+            stats.size_before += sum([phi.size for phi in repr])
+            stats.size_after += sum([phi.size for phi in simplified])
+        repr = simplified
+    if canonicalize:
+        repr = [canonical(phi) for phi in repr]
+    budget = None
+    if timeout is not None or max_nodes is not None or max_memory is not None or cancel is not None:
+        budget = Budget(None if timeout is None else time.monotonic() + timeout, max_nodes, max_memory, cancel, stats)
 
-def apply_box_rule(repr):
-    # return a and-node as a list of list
-    # remove literals and the highest-level boxes and not-boxes
-    # not-boxes are branching
-    new_repr = [[]]
-    # check if there is a not box
-    not_box = False
-    for expr in repr:
-        assert type(expr) == str or type(expr) == tuple
-        if type(expr) == tuple:
-            assert len(expr) == 1 or len(expr) == 2
-            if len(expr) == 2:
-                not_box = True
-                break
-    
-    if not not_box:
-        # node is true only boxes and not not-box, satisfiability is trivial
-        return new_repr
-    
+    # empty list
+    if not repr:
+        verdict = False
+    elif engine == 'ksat':
+        verdict = KsatEngine(cache, order_worlds=order_worlds, stats=stats, hooks=hooks, budget=budget).solve(repr)
+    elif engine != 'tableux':
+        raise ValueError("unknown engine '" + str(engine) + "'")
+    elif executor is None and workers is not None and workers > 1:
+        executor = WorkerPool(workers)
+        try:
+            verdict = TableuxEngine(cache, executor, parallel_threshold, workers, order_worlds, stats, heuristic, hooks, budget,
+                                    semantic, nogoods, logic).solve(repr)
+        finally:
+            # the tasks still running stop at their next budget check, see WorkerPool
+            executor.shutdown(wait=False, cancel_futures=True)
     else:
-        for expr in repr:
-            if type(expr) == tuple:
-                # box
-                if len(expr) == 1:
-                    for branch in new_repr:
-                        assert type(branch) == list
-                        branch.append(expr[0])
-                elif len(expr) == 2:
-                    assert type(expr) == list or type(expr) == tuple
-                    assert type(expr) != str
-                    new_repr += [new_repr[0] + [expr[1]]]
-                else:
-                    raise Exception("tuple length unequal 1 or 2.")
-    
-    return new_repr[1:]
+        verdict = TableuxEngine(cache, executor, parallel_threshold, workers, order_worlds, stats, heuristic, hooks, budget,
+                                semantic, nogoods, logic).solve(repr)
 
-    
+    if key is not None:
+        if verdict is not UNKNOWN:
+            store.put_formula(key, verdict, stats.as_dict())
+        store.commit()
+        if given_stats is not None:
+            given_stats.add(stats)
+        stats = given_stats
+    return (verdict, stats) if return_stats else verdict
 
 
+def apply_box_rule(repr):
+    """label lists of the successor worlds of a saturated branch, given its box- and dia-nodes.
+    every dia-node (not-box) opens a successor world with the formulas of all box-nodes and its own formula as the last label,
+    the successors form an and-node. without a dia-node the list is empty, boxes alone are trivially satisfiable."""
+    boxes = [expr.args[0] for expr in repr if expr.op == 'box']
+    return [boxes + [expr.args[0]] for expr in repr if expr.op == 'dia']
+
+
+
+### modal logics
+
+class ModalLogic:
+    """frame conditions of a normal modal logic, the layer between the worlds of TableuxEngine and the box rule.
+        reflexive   every world sees itself (T axiom), a box-node also adds its formula to its own world
+        transitive  the worlds seen by a successor are seen as well (4 axiom), box-nodes are carried into the successors as they are
+    with a transitive logic a branch of successors need not end. a successor whose label set equals the one of a world on the stack
+    is blocked, it is not expanded but the ancestor is reused as its witness: the model loops back to the ancestor. box-nodes only
+    accumulate along a path, so the labels repeat after at most (box-nodes + 1) * dia-nodes of the closure of the input worlds, and the
+    blocking check is one hash lookup of the label_key. a world that is satisfiable thanks to a blocked successor relies on the ancestor
+    being satisfiable, it is not cached unless it is that ancestor itself, see World.loop.
+    tag is appended to the keys of the world cache and keys the nogoods of a NogoodStore, so that the verdicts of different logics do not
+    mix. K has the empty tag and keeps the keys of the plain label sets."""
+
+    def __init__(self, name, reflexive=False, transitive=False):
+        self.name = name
+        self.reflexive = reflexive
+        self.transitive = transitive
+        self.tag = b'' if not (reflexive or transitive) else b'/' + name.encode()
+
+    def __repr__(self):
+        return 'ModalLogic(' + repr(self.name) + ')'
+
+    def successors(self, modal):
+        """label lists of the successor worlds of a saturated branch with the box- and dia-nodes modal, see apply_box_rule. a transitive
+        logic adds the box-nodes themselves before the formula of the dia-node, which stays the last label. in a reflexive one their
+        formulas follow from the box-nodes in the successor, so they are left out."""
+        if not self.transitive:
+            return apply_box_rule(modal)
+        boxes = [phi for phi in modal if phi.op == 'box']
+        if not self.reflexive:
+            boxes = list(dict.fromkeys([phi.args[0] for phi in boxes] + boxes))
+        return [boxes + [phi.args[0]] for phi in modal if phi.op == 'dia']
+
+
+# logics by name, K is the logic of all frames
+LOGICS = {'K': ModalLogic('K'), 'KT': ModalLogic('KT', reflexive=True), 'K4': ModalLogic('K4', transitive=True),
+          'S4': ModalLogic('S4', reflexive=True, transitive=True)}
+
+
+
+### incremental solving
+
+class SolverWorld(World):
+    """root world of a Solver, its labels are the asserted formulas. a formula asserted while choice points are open sits on the trail
+    above them, undo pushes it again. the pure literal rule is off, a pure literal stops being pure once a formula is asserted."""
+    __slots__ = ('asserted',)
+
+    def __init__(self, stats):
+        super().__init__([], stats=stats)
+        self.pure_rule = False
+        # labels asserted after the first open choice point
+        self.asserted = []
+
+    def undo(self, choice):
+        super().undo(choice)
+        for phi in self.asserted:
+            self.push(phi, 0)
+
+
+class Solver:
+    """incremental tableux method for formulas that grow by conjuncts, e.g. a fixed base formula that is extended and checked again.
+    the asserted formulas are the labels of one SolverWorld that is kept between checks, together with its branch, choice points and
+    LiteralIndex. an assertion continues the search on the current branch with the new formula, the choice points already refuted stay
+    refuted, since a conjunct only removes models. successor worlds come from the world cache.
+        assert_formula(phi)     adds the formula string or formula node phi as a conjunct
+        push()                  opens a scope, pop(n) drops the assertions of the last n scopes
+        check(...)              True, False or UNKNOWN, the budget arguments are the ones of tableux_method
+    opening and dropping a scope resets the branch to its state before the first choice point. the counters of all checks go into
+    stats."""
+
+    def __init__(self, cache=world_cache, order_worlds=True, heuristic='order', hooks=None):
+        self.cache = cache
+        self.order_worlds = order_worlds
+        self.heuristic = heuristic
+        self.hooks = hooks
+        self.stats = TableuxStats()
+        self.world = SolverWorld(self.stats)
+        # verdict of the asserted formulas, None if it has to be checked. False stays until the scope is popped
+        self.verdict = True
+        # one record per scope: lengths as recorded by a choice point, number of labels, verdict
+        self.scopes = []
+
+    def reset(self):
+        """undoes the choice points of the root world, keeping the expansion of the formulas up to the first one."""
+        world = self.world
+        if world.choices:
+            world.undo(world.choices[0])
+            del world.choices[:]
+        del world.asserted[:]
+        world.successors = None
+        world.next = 0
+
+    def assert_formula(self, phi):
+        if type(phi) == str:
+            phi = tableux_representation(phi)
+        world = self.world
+        if world.choices:
+            world.asserted.append(phi)
+        world.push(phi, 0)
+        world.labels.append(phi)
+        # the branch may gain box- and dia-nodes
+        world.successors = None
+        world.next = 0
+        if self.verdict is not False:
+            self.verdict = None
+
+    def push(self):
+        self.reset()
+        world = self.world
+        self.scopes.append([len(world.trail), world.head, world.index.state(), len(world.ors), world.or_head, len(world.modal),
+                            len(world.labels), self.verdict])
+
+    def pop(self, n=1):
+        if n > len(self.scopes):
+            raise IndexError('pop of ' + str(n) + ' scopes, ' + str(len(self.scopes)) + ' are open')
+        self.reset()
+        scope = self.scopes[-n]
+        del self.scopes[-n:]
+        self.world.undo(scope)
+        del self.world.labels[scope[6]:]
+        self.verdict = scope[7]
+
+    def check(self, timeout=None, max_nodes=None, max_memory=None, cancel=None):
+        world = self.world
+        if self.verdict is None and self.cache is not None:
+            self.verdict = self.cache.peek(self.cache.key(world.labels))
+        if self.verdict is not None:
+            return self.verdict
+        budget = None
+        if timeout is not None or max_nodes is not None or max_memory is not None or cancel is not None:
+            # the counters of earlier checks are in self.stats, the budget only counts the nodes of this one
+            budget = Budget(None if timeout is None else time.monotonic() + timeout, max_nodes, max_memory, cancel, self.stats)
+        engine = TableuxEngine(self.cache, order_worlds=self.order_worlds, stats=self.stats, heuristic=self.heuristic, hooks=self.hooks,
+                               budget=budget)
+        verdict = engine.solve(world.labels, world)
+        if verdict is not UNKNOWN:
+            self.verdict = verdict
+        return verdict
+
+
+
+### batch solving
+
+def solve_batch(items, cache=world_cache, workers=None, executor=None, with_stats=False, dedup=False, **options):
+    """solves a stream of formulas in one process. the parse cache of tableux_representation, the world cache cache and the process pool
+    are shared by the whole batch, so repeated formulas and subformulas are solved once.
+    input: iterable of items, each
+        formula string
+        (id, formula string)
+        JSON object line '{"id": ..., "formula": ...}', the id is optional
+    with dedup a formula with the same canonical_fingerprint as a formula decided earlier in the batch is not solved again, a permuted,
+    regrouped or renamed variant gets the verdict of the first one.
+    further keyword arguments are passed on to tableux_method.
+    output: generator of one result dict per item, in input order. ids default to the 0-based position of the item.
+        {'id': id, 'satisfiable': bool, 'time': seconds}                        with_stats adds 'stats': TableuxStats.as_dict(),
+                                                                                'stored': True if the verdict came from the store
+                                                                                option of tableux_method, 'duplicate_of': id of
+                                                                                the first formula if the item was collapsed by dedup,
+                                                                                'size_before' and 'size_after' the Formula.size
+                                                                                before and after the preprocess option
+        {'id': id, 'satisfiable': None, 'unknown': reason, 'time': seconds}     if a limit of the budget options timeout, max_nodes,
+                                                                                max_memory or cancel of tableux_method was reached
+        {'id': id, 'error': exception name, 'message': str, 'position': offset or None}   if the item cannot be parsed or solved,
+                                                                                            the batch goes on with the next item
+    """
+    if executor is None and workers is not None and workers > 1:
+        with WorkerPool(workers) as executor:
+            yield from solve_batch(items, cache, workers, executor, with_stats, dedup, **options)
+        return
+    # canonical fingerprints of the formulas decided so far, to the id of the first one and its verdict
+    decided = {}
+    for index, item in enumerate(items):
+        id, phi = item if type(item) == tuple else (index, item)
+        try:
+            id, phi = _batch_item(id, phi)
+            start = time.perf_counter()
+            repr = tableux_representation(phi)
+            key = canonical_fingerprint(repr) if dedup else None
+            if key in decided:
+                first, satisfiable = decided[key]
+                result = {'id': id, 'satisfiable': satisfiable, 'time': time.perf_counter() - start, 'duplicate_of': first}
+                if with_stats:
+                    result['stats'] = TableuxStats().as_dict()
+                yield result
+                continue
+            satisfiable, stats = tableux_method(repr, cache, workers, executor, return_stats=True, **options)
+            result = {'id': id, 'satisfiable': satisfiable, 'time': time.perf_counter() - start}
+            if key is not None and satisfiable is not UNKNOWN:
+                decided[key] = (id, satisfiable)
+            if satisfiable is UNKNOWN:
+                result['satisfiable'] = None
+                result['unknown'] = stats.stopped
+            if stats.store_hits:
+                result['stored'] = True
+            if stats.size_before:
+                result['size_before'] = stats.size_before
+                result['size_after'] = stats.size_after
+            if with_stats:
+                result['stats'] = stats.as_dict()
+            yield result
+        except Exception as error:
+            yield {'id': id, 'error': type(error).__name__, 'message': str(error), 'position': getattr(error, 'position', None)}
+
+
+def _batch_item(id, phi):
+    """id and formula string of a solve_batch item, decodes JSON object lines."""
+    if phi.lstrip().startswith('{'):
+        # '{' is not a token of the formula syntax, the line is a JSON object
+        record = json.loads(phi)
+        id, phi = record.get('id', id), record['formula']
+    if type(phi) != str:
+        raise TypeError('formula of item ' + repr(id) + ' is not a string')
+    return id, phi
+
+
+def read_formulas(paths):
+    """(id, line) items for solve_batch from the files paths, '-' for stdin. blank lines are skipped.
+    ids are line numbers, prefixed with 'path:' if there is more than one file."""
+    for path in paths:
+        file = sys.stdin if path == '-' else open(path)
+        try:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    yield (number if len(paths) == 1 else path + ':' + str(number)), line.rstrip('\n')
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
 
 
 
@@ -460,7 +2531,7 @@ def generate_formula_series_4(n):
 
 ### test formulae
 
-"""test_formula_1 = ""
+test_formula_1 = ""
 test_formula_2 = "()"
 test_formula_3 = "T"
 test_formula_4 = "(T)"
@@ -498,19 +2569,19 @@ test_formula_34 = "not(p&not(p))"
 test_formula_35 = "(p&q)&(q&r)"
 test_formula_36 = "(p&q)&(not(q)&r)"
 test_formula_37 = "not(not(u) & not(p) & not(q))"
-"""
 
-"""test_formulae = [test_formula_1, test_formula_2, test_formula_3, test_formula_4, test_formula_5, test_formula_6, test_formula_7, test_formula_8, test_formula_9,
+
+test_formulae = [test_formula_1, test_formula_2, test_formula_3, test_formula_4, test_formula_5, test_formula_6, test_formula_7, test_formula_8, test_formula_9,
                  test_formula_10, test_formula_11, test_formula_12, test_formula_13, test_formula_14, test_formula_15, test_formula_16, test_formula_17, test_formula_18, test_formula_19,
                  test_formula_20, test_formula_21, test_formula_22, test_formula_23, test_formula_24, test_formula_25, test_formula_26, test_formula_27, test_formula_28, test_formula_29,
-                 test_formula_30, test_formula_31, test_formula_32, test_formula_33, test_formula_34, test_formula_35, test_formula_36, test_formula_37]"""
+                 test_formula_30, test_formula_31, test_formula_32, test_formula_33, test_formula_34, test_formula_35, test_formula_36, test_formula_37]
 
 
 
 ###
 
 
-"""# ex. 1 sheet 1 formula 1 ((p ∧ q) → ¬r) ∧ (¬p → r) ∧ (¬q → r) ∧ ¬(q → ¬r), satisfiable
+# ex. 1 sheet 1 formula 1 ((p ∧ q) → ¬r) ∧ (¬p → r) ∧ (¬q → r) ∧ ¬(q → ¬r), satisfiable
 test_formula_101 = "not((p & q) & not(not(r))) &\
     not(not(p) & not(r)) &\
     not(not(q) & not(r)) &\
@@ -529,13 +2600,13 @@ test_formula_102 = "not(not(not(p)) & not(q) & not(r)) &\
 #    not(not(u) & not(p) & not(q)) & not(not(r) & not(p)) & not(q & p) & not(not(u) & p)"
 
 
-test_formulae_2 = [test_formula_101, test_formula_102]"""
+test_formulae_2 = [test_formula_101, test_formula_102]
 
 
 
 ###
 
-"""modal_test_formula_1 = "_p"
+modal_test_formula_1 = "_p"
 modal_test_formula_2 = "_(p)"
 modal_test_formula_3 = "_not(p)"
 modal_test_formula_4 = "_(not(p))"
@@ -555,9 +2626,9 @@ modal_test_formula_17 = "not(__not((not(not(q) & not(r)) & not(p))))"
 modal_test_formula_18 = "not(__not((not(not(p) & not(r)) & not(p))))"
 modal_test_formula_19 = "not(__not(((p & not(r)) & not(p))))"
 modal_test_formula_20 = "_not(q & not(_not(p)))"
-"""
 
-"""# □(p → (♢q ∨ ♢r)) ∧ ♢(p ∧ q) ∧ □□((q ∨ r) → p) ∧ □(q → □¬p)
+
+# □(p → (♢q ∨ ♢r)) ∧ ♢(p ∧ q) ∧ □□((q ∨ r) → p) ∧ □(q → □¬p)
 # _not(p & (_not(q) & _not(r))) & not(_not((p & q))) & __not((not(not(q) & not(r)) & not(p))) & _not(q & not(_not(p)))
 modal_test_formula_101 = "_not(p & (_not(q) & _not(r))) &" \
                  " not(_not((p & q))) &" \
@@ -569,28 +2640,86 @@ modal_test_formula_102 = "_not(p & (_not(q) & _not(r))) & " \
                  "not(_not(T)) &" \
                  "_not(not(p) & not(_not(p))) &" \
                  "__(p & not(r)) &" \
-                 "not((_not(p)) & not(not(__not('T'))))"
-"""
+                 "not((_not(p)) & not(not(__not(T))))"
 
 
-"""modal_test_formulae = [modal_test_formula_1, modal_test_formula_2, modal_test_formula_3, modal_test_formula_4, modal_test_formula_5, 
+modal_test_formulae = [modal_test_formula_1, modal_test_formula_2, modal_test_formula_3, modal_test_formula_4, modal_test_formula_5, 
                        modal_test_formula_6, modal_test_formula_7, modal_test_formula_8, modal_test_formula_9, modal_test_formula_10,
                        modal_test_formula_11, modal_test_formula_12, modal_test_formula_13, modal_test_formula_14, modal_test_formula_15,
                        modal_test_formula_16, modal_test_formula_17, modal_test_formula_18, modal_test_formula_19, modal_test_formula_20]
 
 
-modal_test_formulae_2 = [modal_test_formula_101, modal_test_formula_102]"""
+modal_test_formulae_2 = [modal_test_formula_101, modal_test_formula_102]
 
 
 
 
 if __name__ == '__main__':
 
-
-    ### prompt for input formula
-    phi = input_formula()
-    satisfiable = tableux_method(tableux_representation(phi))
-    print("Input formula satisfiable:", satisfiable)
+    parser = argparse.ArgumentParser(description='decides satisfiability of formulas of modal logic K with the tableux method. '
+                                     'without arguments and on a terminal it prompts for one formula, otherwise it reads one formula '
+                                     'or JSON object {"id": ..., "formula": ...} per line and writes one JSON result per line.')
+    parser.add_argument('files', nargs='*', help="input files, '-' for stdin (default)")
+    parser.add_argument('-o', '--output', help='output file, stdout by default')
+    parser.add_argument('--workers', type=int, help='size of the process pool shared by the batch')
+    parser.add_argument('--heuristic', choices=BRANCHING_HEURISTICS, default='order')
+    parser.add_argument('--engine', choices=ENGINES, default='tableux')
+    parser.add_argument('--cache-size', type=int, default=world_cache.maxsize, help='entries of the world cache, 0 disables it')
+    parser.add_argument('--store', help='SQLite file of a ResultStore, verdicts found there are not solved again')
+    parser.add_argument('--store-size', type=int, default=1000000, help='entries of each table of the store')
+    parser.add_argument('--stats', action='store_true', help='add the TableuxStats counters to every result')
+    parser.add_argument('--simplify', action='store_true', help='simplify every formula before the tableux method')
+    parser.add_argument('--canonicalize', action='store_true', help='solve the canonical form of every formula')
+    parser.add_argument('--semantic', action='store_true', help='semantic branching, see World')
+    parser.add_argument('--logic', choices=sorted(LOGICS), default='K', help='modal logic, K by default')
+    parser.add_argument('--nogoods', type=int, default=0, help='entries of a NogoodStore shared by the batch, 0 (default) for none')
+    parser.add_argument('--dedup', action='store_true',
+                        help='solve formulas that are equal up to order, grouping and atom names once, the count goes to stderr')
+    parser.add_argument('--timeout', type=float, help='seconds per formula, after which its verdict is unknown')
+    parser.add_argument('--max-nodes', type=int, help='tableau nodes per formula, after which its verdict is unknown')
+    parser.add_argument('--max-memory', type=float, help='megabytes of resident memory, above which verdicts are unknown')
+    parser.add_argument('--trace', help='file to write a sampled trace of rule applications, branches and clashes to')
+    parser.add_argument('--trace-every', type=int, default=1000, help='sample every n-th event of the trace')
+    args = parser.parse_args()
+
+    store = None if args.store is None else ResultStore(args.store, args.store_size)
+    cache = SatCache(args.cache_size) if args.cache_size > 0 else None
+    nogoods = NogoodStore(args.nogoods) if args.nogoods > 0 else None
+    hooks = None if args.trace is None else TraceHooks(open(args.trace, 'w'), args.trace_every)
+    max_memory = None if args.max_memory is None else int(args.max_memory * 1e6)
+    # options of tableux_method, the same for the prompted formula and for a batch
+    options = {'heuristic': args.heuristic, 'hooks': hooks, 'timeout': args.timeout, 'max_nodes': args.max_nodes, 'max_memory': max_memory,
+               'preprocess': args.simplify, 'engine': args.engine, 'store': store, 'canonicalize': args.canonicalize,
+               'semantic': args.semantic, 'nogoods': nogoods, 'logic': args.logic}
+    errors = 0
+    if not args.files and sys.stdin.isatty():
+        ### prompt for input formula
+        phi = input_formula()
+        satisfiable, stats = tableux_method(tableux_representation(phi), cache, args.workers, return_stats=True, **options)
+        print("Input formula satisfiable:", satisfiable if satisfiable is not UNKNOWN else 'unknown (' + stats.stopped + ')')
+        if args.simplify:
+            print("Formula size before and after simplification:", stats.size_before, stats.size_after)
+        if args.stats:
+            print(json.dumps(stats.as_dict()))
+    else:
+        ### batch of formulas, JSON lines out
+        output = sys.stdout if args.output is None else open(args.output, 'w')
+        duplicates = 0
+        for result in solve_batch(read_formulas(args.files or ['-']), cache, args.workers, with_stats=args.stats, dedup=args.dedup,
+                                  **options):
+            errors += 'error' in result
+            duplicates += 'duplicate_of' in result
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+        if output is not sys.stdout:
+            output.close()
+        if args.dedup:
+            print('collapsed', duplicates, 'duplicate formulas', file=sys.stderr)
+    if hooks is not None:
+        hooks.file.close()
+    if store is not None:
+        store.close()
+    sys.exit(1 if errors else 0)
 
     ### test formulae
 
@@ -636,40 +2765,4 @@ if __name__ == '__main__':
             print()"""
     
 
-    ### performance measure
-    
-    """n=6
-
-    formula_series_list = [
-        generate_formula_series_1(n),
-        generate_formula_series_2(n),
-        generate_formula_series_3(n),
-        generate_formula_series_4(n)
-    ]"""
-
-    """
-    ou = []
-    for formula_series in formula_series_list:
-        ou.append([])
-        for formula in formula_series:
-            pr = cProfile.Profile()
-            pr.enable()
-            # ... do something ...
-            tableux_method(tableux_representation(formula))
-            pr.disable()
-            s = io.StringIO()
-            sortby = SortKey.CUMULATIVE
-            ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-            ps.print_stats()
-            print(s.getvalue())
-            ti = s.getvalue().partition('\n')[0].strip()
-            #print(ti) 
-            sp = ti.split(' ')
-            #di = (sp[0], sp[-2])
-            di = sp[-2]
-            ou[-1].append(di)
-    
-    print(ou)
-    """
-
-
+    ### performance measure, see benchmark.py
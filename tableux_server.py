@@ -0,0 +1,468 @@
+"""module tableux_server.py is a long-running solver service for program tableux.py. the parse cache of tableux_representation and the
+world cache stay warm across requests, so a formula pays neither the python startup nor cold caches.
+
+    python tableux_server.py serve (--socket PATH | --port N) [--workers 4] [--timeout 10] [--heuristic order] [--engine tableux]
+                                                                                   [--logic K] [--max-formulas 500000]
+    python tableux_server.py client (--socket PATH | --port N) [formula ...] [--stats]
+
+protocol: one JSON object per line in both directions, over a Unix domain socket or TCP on localhost. a connection may send requests
+without waiting for the replies, they are solved concurrently and answered in request order.
+    {"id": ..., "formula": "...", "timeout": s, "max_nodes": n, "heuristic": h, "engine": e, "logic": l, "preprocess": bool,
+     "stats": bool}
+        solves the formula, all keys except formula are optional and default to the options of the server. the reply is the
+        solve_batch result of the formula, see tableux.solve_batch. the timeout counts from the arrival of the request, time spent
+        waiting for a worker included
+    {"op": "stats"}
+        counters of the server, see TableuxServer.stats
+    {"op": "ping"}
+        {"ok": true}
+load-generator.py measures throughput and latency percentiles against a running server.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import tableux
+
+
+# keys of a solve request that are passed on to tableux_method
+REQUEST_OPTIONS = ('heuristic', 'engine', 'logic', 'preprocess', 'max_nodes')
+
+# seconds a worker may overrun the timeout of a request, e.g. in a long parse, before the server answers unknown without it
+TIMEOUT_GRACE = 1.0
+
+# longest request line in bytes
+MAX_REQUEST = 1 << 24
+
+# nodes of the intern table of a worker above which it is emptied before the next request, some 200 MB
+MAX_FORMULAS = 500000
+
+
+### workers
+
+def _init_worker(cache_size):
+    """initializer of the worker processes. the server process handles SIGINT and shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    tableux.world_cache.maxsize = cache_size or None
+
+
+# times the intern table of the worker was emptied
+_resets = 0
+
+def _solve(id, phi, deadline, cache_size, max_formulas, options):
+    """solves one request in a worker, with the parse cache and the world cache of the worker, by the time.monotonic() deadline.
+    the intern table of the formula DAG keeps every subformula the worker has seen. once it holds more than max_formulas nodes it is
+    emptied together with the caches, see tableux.reset_formulas, so the memory of a worker stays bounded however many distinct formulas
+    it solves. the caches are cold again after that.
+    output: (solve_batch result with stats, process id, cache counters of the worker)"""
+    global _resets
+    if max_formulas is not None and tableux.formula_count() > max_formulas:
+        tableux.reset_formulas()
+        _resets += 1
+    cache = tableux.world_cache if cache_size else None
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.monotonic()
+    if timeout is not None and timeout <= 0:
+        # expired while waiting for a worker
+        result = {'id': id, 'satisfiable': None, 'unknown': 'deadline', 'time': 0.0, 'stats': None}
+    else:
+        result = next(tableux.solve_batch([(id, phi)], cache, with_stats=True, timeout=timeout, **options))
+    parse = tableux.tableux_representation.cache_info()
+    caches = {'world_cache': tableux.world_cache.stats(),
+              'parse_cache': {'size': parse.currsize, 'maxsize': parse.maxsize, 'hits': parse.hits, 'misses': parse.misses},
+              'formulas': {'size': tableux.formula_count(), 'maxsize': max_formulas, 'resets': _resets}}
+    return result, os.getpid(), caches
+
+
+def check_request(request):
+    """raises TypeError or ValueError if a key of the solve request has a value of the wrong type or out of range."""
+    for name in ('timeout', 'max_nodes'):
+        value = request.get(name)
+        if value is None:
+            continue
+        if type(value) == bool or type(value) not in ((int, float) if name == 'timeout' else (int,)):
+            raise TypeError(name + ' of request ' + repr(request.get('id')) + ' is not ' + ('a number' if name == 'timeout' else 'an int'))
+        if not value >= 0:
+            raise ValueError(name + ' of request ' + repr(request.get('id')) + ' is negative')
+    for name in ('preprocess', 'stats'):
+        if name in request and type(request[name]) != bool:
+            raise TypeError(name + ' of request ' + repr(request.get('id')) + ' is not a bool')
+    for name, choices in (('heuristic', tableux.BRANCHING_HEURISTICS), ('engine', tableux.ENGINES), ('logic', tableux.LOGICS)):
+        if name in request and (type(request[name]) != str or request[name] not in choices):
+            raise ValueError(name + ' of request ' + repr(request.get('id')) + ' is not one of ' + ', '.join(choices))
+
+
+def percentile(values, q):
+    """q-th percentile, 0 <= q <= 100, of the sorted list values by the nearest-rank method, None for no values."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+### server
+
+class TableuxServer:
+    """asyncio server that answers the JSON line requests of the protocol with a pool of workers.
+        workers         number of worker processes, each with its own warm caches. 0 solves in a thread of the server process
+        timeout         default seconds per request, None for no limit
+        cache_size      entries of the world cache of each worker, 0 disables it
+        max_formulas    nodes of the intern table of a worker above which it is emptied between two requests, None for no bound
+        options         defaults of the REQUEST_OPTIONS, further keyword arguments of tableux_method such as max_memory
+    """
+
+    def __init__(self, workers=None, timeout=None, cache_size=tableux.world_cache.maxsize, max_formulas=MAX_FORMULAS, **options):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_formulas = max_formulas
+        self.options = options
+        self.executor = None
+        self.server = None
+        self.path = None
+        self.started = time.monotonic()
+        # counters
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.verdicts = {'sat': 0, 'unsat': 0, 'unknown': 0, 'error': 0}
+        self.timeouts = 0
+        self.latencies = deque(maxlen=10000)
+        self.totals = tableux.TableuxStats()
+        self.caches = {}
+
+    async def start(self, path=None, host='127.0.0.1', port=None):
+        """listens on the Unix domain socket path or else on TCP host:port. port 0 picks a free port, see address."""
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.cache_size,))
+        else:
+            tableux.world_cache.maxsize = self.cache_size or None
+            self.executor = ThreadPoolExecutor(1)
+        if path is not None:
+            # a socket file left behind by a server that was killed
+            if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self.handle, path, limit=MAX_REQUEST)
+            self.path = path
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST)
+        return self
+
+    @property
+    def address(self):
+        """socket path or (host, port) the server listens on."""
+        return self.path if self.path is not None else self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """serves one connection. requests are read ahead and solved concurrently, a bounded queue of pending replies keeps the order
+        and stops reading when a client sends faster than the workers solve."""
+        self.connections += 1
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        replies = asyncio.Queue(maxsize=4 * max(self.workers, 1))
+        sender = asyncio.create_task(self.send(replies, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than MAX_REQUEST, the rest of the line cannot be skipped
+                    await replies.put(self.error(None, ValueError('request longer than ' + str(MAX_REQUEST) + ' bytes')))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await replies.put(asyncio.ensure_future(self.reply(line, time.monotonic())))
+            await replies.put(None)
+            await sender
+        except ConnectionError:
+            await replies.put(None)
+            await sender
+        except asyncio.CancelledError:
+            # the server shuts down, the pending replies are dropped
+            sender.cancel()
+        finally:
+            writer.close()
+
+    async def send(self, replies, writer):
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                return
+            try:
+                if asyncio.isfuture(reply):
+                    reply = await reply
+                line = json.dumps(reply).encode() + b'\n'
+            except Exception as error:
+                # a reply that failed is answered as an error, the connection goes on with the next request
+                line = json.dumps(self.error(None, error)).encode() + b'\n'
+            try:
+                writer.write(line)
+                await writer.drain()
+            except ConnectionError:
+                # the client is gone, the remaining replies are still awaited so their counters add up
+                pass
+
+    async def reply(self, line, arrival):
+        """reply to one request line received at time.monotonic() arrival."""
+        try:
+            request = json.loads(line)
+            if type(request) != dict:
+                raise ValueError('request is not a JSON object')
+        except ValueError as error:
+            return self.error(None, error)
+        op = request.get('op', 'solve')
+        if op == 'stats':
+            return self.stats()
+        if op == 'ping':
+            return {'ok': True}
+        if op != 'solve':
+            return self.error(request.get('id'), ValueError("unknown op '" + str(op) + "'"))
+        return await self.solve(request, arrival)
+
+    async def solve(self, request, arrival):
+        self.requests += 1
+        id = request.get('id', self.requests - 1)
+        unknown = set(request) - {'op', 'id', 'formula', 'timeout', 'stats'} - set(REQUEST_OPTIONS)
+        if unknown:
+            self.verdicts['error'] += 1
+            return self.error(id, ValueError("unknown request key '" + sorted(unknown)[0] + "'"))
+        phi = request.get('formula')
+        if type(phi) != str:
+            self.verdicts['error'] += 1
+            return self.error(id, TypeError('formula of request ' + repr(id) + ' is not a string'))
+        try:
+            check_request(request)
+        except (TypeError, ValueError) as error:
+            self.verdicts['error'] += 1
+            return self.error(id, error)
+        options = dict(self.options)
+        options.update((name, request[name]) for name in REQUEST_OPTIONS if name in request)
+        timeout = request.get('timeout', self.timeout)
+        deadline = None if timeout is None else arrival + timeout
+
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, _solve, id, phi, deadline, self.cache_size, self.max_formulas, options)
+        try:
+            if deadline is None:
+                result, pid, caches = await future
+            else:
+                result, pid, caches = await asyncio.wait_for(future, deadline - time.monotonic() + TIMEOUT_GRACE)
+        except asyncio.TimeoutError:
+            # the worker overran the deadline, it finishes the request in the background
+            self.timeouts += 1
+            result, pid = {'id': id, 'satisfiable': None, 'unknown': 'deadline', 'time': time.monotonic() - arrival}, None
+        except Exception as error:
+            # e.g. a worker process died
+            result, pid = self.error(id, error), None
+        finally:
+            self.in_flight -= 1
+        self.latencies.append(time.monotonic() - arrival)
+
+        if pid is not None:
+            self.caches[pid] = caches
+        stats = result.pop('stats', None)
+        if stats is not None:
+            self.count(stats)
+            if request.get('stats'):
+                result['stats'] = stats
+        if 'error' in result:
+            self.verdicts['error'] += 1
+        elif result['satisfiable'] is None:
+            self.verdicts['unknown'] += 1
+        else:
+            self.verdicts['sat' if result['satisfiable'] else 'unsat'] += 1
+        return result
+
+    def count(self, stats):
+        """adds the TableuxStats.as_dict() stats of a request to the totals of the server."""
+        for name, value in stats.items():
+            if name.startswith('max_'):
+                setattr(self.totals, name, max(getattr(self.totals, name), value))
+            elif name != 'stopped':
+                setattr(self.totals, name, getattr(self.totals, name) + value)
+
+    @staticmethod
+    def error(id, error):
+        return {'id': id, 'error': type(error).__name__, 'message': str(error), 'position': getattr(error, 'position', None)}
+
+    def stats(self):
+        """counters of the server since it started.
+            uptime, connections, requests, in_flight, workers
+            verdicts    sat, unsat, unknown and error replies to solve requests
+            timeouts    requests answered unknown because their worker overran the deadline by TIMEOUT_GRACE
+            latency     seconds from arrival to reply of the last 10000 solve requests, mean and the percentiles p50, p90, p99, max
+            totals      TableuxStats counters added up over all requests, maxima for the max_ counters
+            caches      world cache, parse cache and intern table counters of each worker by process id, as of its last request
+        """
+        latencies = sorted(self.latencies)
+        latency = {'count': len(latencies), 'mean': sum(latencies) / len(latencies) if latencies else None}
+        for q in (50, 90, 99, 100):
+            latency['max' if q == 100 else 'p' + str(q)] = percentile(latencies, q)
+        totals = self.totals.as_dict()
+        del totals['stopped']
+        return {'uptime': time.monotonic() - self.started, 'connections': self.connections, 'requests': self.requests,
+                'in_flight': self.in_flight, 'workers': self.workers, 'verdicts': dict(self.verdicts), 'timeouts': self.timeouts,
+                'latency': latency, 'totals': totals, 'caches': {str(pid): caches for pid, caches in self.caches.items()}}
+
+
+def serve(path=None, host='127.0.0.1', port=None, **options):
+    """runs a TableuxServer with the options until SIGINT or SIGTERM."""
+
+    async def main():
+        server = await TableuxServer(**options).start(path, host, port)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        print('listening on', server.address, 'with', server.workers, 'workers', file=sys.stderr, flush=True)
+        try:
+            await stop.wait()
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+
+
+### client
+
+class TableuxClient:
+    """blocking client of a TableuxServer, one connection. usable as a context manager.
+        path        Unix domain socket of the server, or else
+        host, port  TCP address of the server
+        timeout     socket timeout in seconds, None to wait for every reply however long it takes
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None):
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def send(self, request):
+        """sends one request without waiting for its reply, see receive."""
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+
+    def receive(self):
+        """the next reply, replies come in request order."""
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('connection closed by the server')
+        return json.loads(line)
+
+    def request(self, request):
+        self.send(request)
+        return self.receive()
+
+    def solve(self, formula, id=None, **options):
+        """solve_batch result of the formula. options are the keys of a solve request: timeout, stats and the REQUEST_OPTIONS."""
+        request = {'formula': formula, **options}
+        if id is not None:
+            request['id'] = id
+        return self.request(request)
+
+    def stats(self):
+        return self.request({'op': 'stats'})
+
+
+def client_request(id, line, options):
+    """request of the client for one input line, a formula or a JSON object request of the protocol. a solve request gets the id and the
+    options, e.g. the timeout, unless it has its own. raises ValueError for a line that is not valid JSON."""
+    if not line.lstrip().startswith('{'):
+        return {'id': id, 'formula': line, **options}
+    # '{' is not a token of the formula syntax, the line is a JSON object
+    request = json.loads(line)
+    if request.get('op', 'solve') == 'solve':
+        request = {'id': id, **options, **request}
+    return request
+
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='long-running solver service of tableux.py, JSON lines over a Unix or TCP socket.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'client'):
+        command = commands.add_parser(name)
+        address = command.add_mutually_exclusive_group(required=True)
+        address.add_argument('--socket', help='path of the Unix domain socket')
+        address.add_argument('--port', type=int, help='TCP port')
+        command.add_argument('--host', default='127.0.0.1', help='TCP host, localhost by default')
+
+    serve_command = commands.choices['serve']
+    serve_command.add_argument('--workers', type=int, help='worker processes, the number of CPUs by default, 0 solves in a thread')
+    serve_command.add_argument('--timeout', type=float, help='default seconds per request, after which its verdict is unknown')
+    serve_command.add_argument('--max-nodes', type=int, help='default tableau nodes per request, after which its verdict is unknown')
+    serve_command.add_argument('--max-memory', type=float, help='megabytes of resident memory per worker, above which verdicts are unknown')
+    serve_command.add_argument('--heuristic', choices=tableux.BRANCHING_HEURISTICS, default='order')
+    serve_command.add_argument('--engine', choices=tableux.ENGINES, default='tableux')
+    serve_command.add_argument('--logic', choices=sorted(tableux.LOGICS), default='K', help='default modal logic, K by default')
+    serve_command.add_argument('--simplify', action='store_true', help='simplify every formula before the tableux method')
+    serve_command.add_argument('--cache-size', type=int, default=tableux.world_cache.maxsize,
+                               help='entries of the world cache of each worker, 0 disables it')
+    serve_command.add_argument('--max-formulas', type=int, default=MAX_FORMULAS,
+                               help='formula nodes interned by a worker, above which it empties its intern table and caches')
+
+    client_command = commands.choices['client']
+    client_command.add_argument('formulas', nargs='*', help='formulas to solve, one per line from stdin if none are given. a line may '
+                                'also be a JSON object request of the protocol')
+    client_command.add_argument('--timeout', type=float, help='seconds per formula, the default of the server if not given')
+    client_command.add_argument('--stats', action='store_true', help='print the counters of the server')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket, args.host, args.port, workers=args.workers, timeout=args.timeout, cache_size=args.cache_size,
+              max_formulas=args.max_formulas,
+              heuristic=args.heuristic, engine=args.engine, logic=args.logic, preprocess=args.simplify, max_nodes=args.max_nodes,
+              max_memory=None if args.max_memory is None else int(args.max_memory * 1e6))
+    else:
+        errors = 0
+        with TableuxClient(args.socket, args.host, args.port) as client:
+            if args.formulas or not args.stats:
+                options = {} if args.timeout is None else {'timeout': args.timeout}
+                for id, line in (enumerate(args.formulas) if args.formulas else tableux.read_formulas(['-'])):
+                    try:
+                        result = client.request(client_request(id, line, options))
+                    except ValueError as error:
+                        result = TableuxServer.error(id, error)
+                    errors += 'error' in result
+                    print(json.dumps(result), flush=True)
+            if args.stats:
+                print(json.dumps(client.stats(), indent=2))
+        sys.exit(1 if errors else 0)
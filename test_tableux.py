@@ -0,0 +1,424 @@
+"""tests of program tableux.py, run with python -m pytest.
+the engines are compared on random formulas with reference, a plain recursive tableux like the original implementation of the exercise
+that works on tuples of its own, so it shares neither the parser nor the formula DAG with tableux.py.
+"""
+
+import json
+import os
+import pty
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import benchmark
+import tableux
+from tableux import ENGINES, TableuxStats, UNKNOWN, tableux_method, tableux_representation
+
+
+### reference tableux
+
+def reference_formula(text):
+    """tuple formula of an input string in the syntax of the original exercise: T, F, atoms, not(, (, ), & and _. an empty conjunct is
+    T."""
+    tokens = re.findall(r"\s*(not\(|[a-z]+[0-9]*|\S)", text) + ['']
+    position = 0
+
+    def conjunction():
+        nonlocal position
+        f = operand()
+        while tokens[position] == '&':
+            position += 1
+            f = ('and', f, operand())
+        return f
+
+    def operand():
+        nonlocal position
+        token = tokens[position]
+        if token in ('&', ')', ''):
+            return ('T',)
+        position += 1
+        if token == '_':
+            return ('box', operand())
+        if token in ('(', 'not('):
+            f = conjunction()
+            assert tokens[position] == ')'
+            position += 1
+            return ('not', f) if token == 'not(' else f
+        return (token,) if token in ('T', 'F') else ('atom', token)
+
+    f = conjunction()
+    assert tokens[position] == ''
+    return f
+
+
+def random_formula(rng, depth, atoms=('p', 'q', 'r')):
+    """random formula as a tuple ('atom', name), ('not', f), ('and', f, g) or ('box', f)."""
+    if depth == 0 or rng.random() < 0.2:
+        return ('atom', rng.choice(atoms))
+    c = rng.random()
+    if c < 0.35:
+        return ('and', random_formula(rng, depth - 1, atoms), random_formula(rng, depth - 1, atoms))
+    if c < 0.7:
+        return ('not', random_formula(rng, depth - 1, atoms))
+    return ('box', random_formula(rng, depth - 1, atoms))
+
+
+def formula_input(f):
+    """f in the input format of tableux_representation."""
+    if f[0] == 'atom':
+        return f[1]
+    if f[0] == 'not':
+        return 'not(' + formula_input(f[1]) + ')'
+    if f[0] == 'and':
+        return '(' + formula_input(f[1]) + '&' + formula_input(f[2]) + ')'
+    return '_' + formula_input(f[1])
+
+
+def nnf(f, positive=True):
+    if f[0] == 'T' or f[0] == 'F':
+        return f if positive else (('F',) if f[0] == 'T' else ('T',))
+    if f[0] == 'atom':
+        return f if positive else ('natom', f[1])
+    if f[0] == 'not':
+        return nnf(f[1], not positive)
+    if f[0] == 'and':
+        return ('and' if positive else 'or', nnf(f[1], positive), nnf(f[2], positive))
+    return ('box' if positive else 'dia', nnf(f[1], positive))
+
+
+def reference(labels):
+    """K-satisfiability of the set of nnf tuples labels."""
+    labels = set(labels)
+    for f in labels:
+        if f[0] == 'and':
+            return reference(labels - {f} | {f[1], f[2]})
+    for f in labels:
+        if f[0] == 'or':
+            rest = labels - {f}
+            return reference(rest | {f[1]}) or reference(rest | {f[2]})
+    if ('F',) in labels or any(f[0] == 'atom' and ('natom', f[1]) in labels for f in labels):
+        return False
+    boxes = {f[1] for f in labels if f[0] == 'box'}
+    return all(reference(boxes | {f[1]}) for f in labels if f[0] == 'dia')
+
+
+def random_cases(seed, count, depth=5, conjuncts=4):
+    """pairs of input formula and reference verdict, conjunctions over two atoms so about half of them are unsatisfiable."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        f = random_formula(rng, depth, ('p', 'q'))
+        for _ in range(conjuncts - 1):
+            f = ('and', f, random_formula(rng, depth, ('p', 'q')))
+        yield formula_input(f), reference({nnf(f)})
+
+
+
+### engines against the reference
+
+@pytest.mark.parametrize('options', [{}, {'engine': 'ksat'}, {'semantic': True}, {'heuristic': 'moms'}, {'preprocess': True},
+                                     {'canonicalize': True}],
+                         ids=['default', 'ksat', 'semantic', 'moms', 'preprocess', 'canonicalize'])
+def test_engines_agree_with_reference(options):
+    for phi, expected in random_cases(1, 400):
+        assert tableux_method(tableux_representation(phi), cache=None, **options) == expected, phi
+
+
+def test_world_cache_agrees_with_reference():
+    cache = tableux.SatCache()
+    for phi, expected in random_cases(2, 400):
+        assert tableux_method(tableux_representation(phi), cache=cache) == expected, phi
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_formula_series_agree_with_reference(engine):
+    for k in range(1, 5):
+        for phi in getattr(tableux, 'generate_formula_series_' + str(k))(4):
+            assert tableux_method(tableux_representation(phi), cache=None, engine=engine) == reference({nnf(reference_formula(phi))}), phi
+
+
+def test_solver_push_pop_agrees_with_reference():
+    rng = random.Random(3)
+    for _ in range(60):
+        base = [random_formula(rng, 4) for _ in range(2)]
+        extra = [random_formula(rng, 4) for _ in range(2)]
+        solver = tableux.Solver(cache=None)
+        for f in base:
+            solver.assert_formula(formula_input(f))
+        assert solver.check() == reference({nnf(f) for f in base})
+        solver.push()
+        for f in extra:
+            solver.assert_formula(formula_input(f))
+            assert solver.check() == reference({nnf(f) for f in base + extra[:extra.index(f) + 1]})
+        solver.pop()
+        assert solver.check() == reference({nnf(f) for f in base})
+
+
+
+### parser
+
+def test_long_modal_prefix():
+    phi = tableux_representation('_' * 100000 + 'p')
+    assert phi.depth == 100000
+    assert tableux_representation('<>' * 10 + '_p').depth == 11
+
+
+@pytest.mark.parametrize('text', ['p|', '|p', 'p->', '->p', 'p||q', 'p->q->', '(p|)&q', 'not(q->)', 'p&(|q)'])
+def test_empty_operand_of_or_and_implication(text):
+    with pytest.raises(tableux.FormulaSyntaxError, match='empty operand'):
+        tableux_representation(text)
+
+
+def test_empty_conjunct_is_top():
+    assert tableux_representation('p&q&') is tableux_representation('p&q')
+    assert tableux_representation('p&&q') is tableux_representation('p&q')
+    assert tableux_representation('not(p&)') is tableux_representation('not(p)')
+    assert tableux_representation('') is tableux.TOP
+
+
+
+### simplification
+
+def test_preprocess_reports_sizes():
+    phi = tableux_representation('(p&(p|q))&_a&_b&(r|T)')
+    verdict, stats = tableux_method(phi, cache=None, preprocess=True, return_stats=True)
+    assert verdict is True
+    assert stats.size_before == phi.size and stats.size_after == tableux.simplify(phi).size < phi.size
+    assert tableux_method(phi, cache=None, return_stats=True)[1].size_before == 0
+
+
+def test_batch_and_benchmark_report_sizes():
+    result, plain = tableux.solve_batch(['(p&(p|q))&_a&_b', 'p'], preprocess=True, with_stats=True)
+    assert result['size_before'] > result['size_after'] == result['stats']['size_after']
+    assert plain['size_before'] == plain['size_after'] == 1
+    assert 'size_before' not in next(tableux.solve_batch(['p&q']))
+    assert {'size_before', 'size_after'} <= set(benchmark.CSV_FIELDS)
+    assert benchmark.solve('(p&(p|q))&_a&_b', {'preprocess': True})[1].size_after == result['size_after']
+
+
+def test_cli_reports_sizes():
+    script = os.path.join(os.path.dirname(__file__), 'tableux.py')
+    process = subprocess.run([sys.executable, script, '--simplify'], input='(p&(p|q))&_a&_b\n', capture_output=True, text=True,
+                             timeout=60)
+    result = json.loads(process.stdout)
+    assert result['satisfiable'] is True and result['size_before'] > result['size_after']
+
+
+
+### canonical form
+
+def test_canonical_is_idempotent():
+    phi = tableux_representation('<>((not(r)|r)&(r|not(r))|p)')
+    assert tableux.canonical(phi) is tableux.canonical(tableux.canonical(phi))
+    for text, _ in random_cases(4, 500, depth=6):
+        phi = tableux_representation(text)
+        assert tableux.canonical(phi) is tableux.canonical(tableux.canonical(phi)), text
+
+
+def test_canonical_fingerprint_ignores_order_and_grouping():
+    assert tableux.canonical_fingerprint(tableux_representation('(p&q)&r')) == \
+        tableux.canonical_fingerprint(tableux_representation('r&(q&p)'))
+    assert tableux.canonical_fingerprint(tableux_representation('<>((not(r)|r)&(r|not(r))|p)')) == \
+        tableux.canonical_fingerprint(tableux_representation('<>(p|r|not(r))'))
+
+
+
+### result store
+
+def test_store_hit_returns_stored_counters():
+    store = tableux.ResultStore(':memory:')
+    phi = tableux_representation('(p|q)&(not(p)|r)&<>(a|b)')
+    verdict, first = tableux_method(phi, cache=None, store=store, return_stats=True)
+    stored, second = tableux_method(phi, cache=None, store=store, return_stats=True)
+    assert stored == verdict
+    assert second.store_hits == 1
+    assert second.worlds == first.worlds and second.rule_or == first.rule_or
+    store.close()
+
+
+### literal index
+
+def test_literal_bits_are_numbered_per_index():
+    atoms = [tableux.atom('x' + str(i)) for i in range(5000)]
+    index = tableux.LiteralIndex()
+    assert index.add(atoms[-1]) and index.add(tableux.negation(atoms[0]))
+    # the bitsets are as wide as the atoms of the branch
+    assert (index.positive, index.negative) == (1, 2)
+    state = index.state()
+    assert index.add(atoms[1]) and not index.add(tableux.negation(atoms[-1]))
+    index.restore(state)
+    assert index.add(tableux.negation(atoms[1])) and not index.add(atoms[0])
+
+
+
+### budgets
+
+def pigeonhole(n, name='p'):
+    """n+1 pigeons in n holes, unsatisfiable and exponential for the tableux."""
+    holes = '&'.join('(' + '|'.join(name + str(i * n + j) for j in range(n)) + ')' for i in range(n + 1))
+    pairs = '&'.join('(not({0}{1})|not({0}{2}))'.format(name, i * n + j, k * n + j)
+                     for j in range(n) for i in range(n + 1) for k in range(i + 1, n + 1))
+    return holes + '&' + pairs
+
+
+def test_max_nodes_counts_each_run():
+    stats = TableuxStats()
+    phi = tableux_representation('(p|q)&(r|s)&<>(a|b)')
+    verdicts = [tableux_method(phi, cache=None, stats=stats, max_nodes=10) for _ in range(8)]
+    assert verdicts == [True] * 8
+    assert stats.worlds + stats.branches_opened > 10
+
+
+def test_max_nodes_zero_allows_the_root_world():
+    assert tableux_method(tableux_representation('p'), cache=None, max_nodes=0) is True
+    assert tableux_method(tableux_representation('<>p'), cache=None, max_nodes=0) is UNKNOWN
+    assert tableux_method(tableux_representation('<>p'), cache=None, max_nodes=1) is True
+
+
+@pytest.mark.parametrize('limit', ['cancelled', 'deadline', 'max_nodes'])
+def test_parallel_run_stops_at_its_limit(limit):
+    # the successor worlds go to the worker processes, the engine only waits for them
+    phi = tableux_representation('<>(' + pigeonhole(7) + ')&<>(' + pigeonhole(7, 'r') + ')')
+    cancel = tableux.CancellationToken()
+    timer = threading.Timer(0.3, cancel.cancel)
+    options = {'cancelled': {'cancel': cancel}, 'deadline': {'timeout': 0.3}, 'max_nodes': {'max_nodes': 2000}}[limit]
+    start = time.monotonic()
+    timer.start()
+    try:
+        verdict, stats = tableux_method(phi, cache=None, workers=2, parallel_threshold=1, return_stats=True, **options)
+    finally:
+        timer.cancel()
+    assert verdict is UNKNOWN and stats.stopped == limit
+    assert time.monotonic() - start < 10
+
+
+def test_solver_max_nodes_counts_each_check():
+    solver = tableux.Solver(cache=None)
+    solver.assert_formula('(p|q)&<>(r|t)')
+    for i in range(30):
+        solver.push()
+        solver.assert_formula('(a{0}|b{0})&<>(c{0}|d{0})'.format(i))
+        assert solver.check(max_nodes=50) is True
+        solver.pop()
+
+
+
+### nogoods
+
+def test_nogoods_agree_with_reference():
+    cache = tableux.SatCache()
+    nogoods = tableux.NogoodStore(256)
+    for phi, expected in random_cases(2, 400):
+        assert tableux_method(tableux_representation(phi), cache=cache, nogoods=nogoods) == expected, phi
+
+
+def test_nogoods_are_kept_apart_by_logic():
+    # <>(_q&not(q)) is unsatisfiable in KT only, a nogood learned under KT must not close the successor under K
+    nogoods = tableux.NogoodStore()
+    phi = tableux_representation('<>(_q&not(q))')
+    assert tableux_method(phi, cache=None, nogoods=nogoods, logic='KT') is False
+    assert tableux_method(phi, cache=None, nogoods=nogoods, logic='K') is True
+    assert tableux_method(phi, cache=None, nogoods=nogoods, logic='KT') is False
+    assert len(nogoods) > 0 and nogoods.hits > 0
+
+
+
+### modal logics
+
+def test_modal_logics():
+    # T: _p -> p, 4: _p -> __p
+    for logic, t, four in (('K', False, False), ('KT', True, False), ('K4', False, True), ('S4', True, True)):
+        assert tableux_method(tableux_representation('_p & not(p)'), cache=None, logic=logic) == (not t)
+        assert tableux_method(tableux_representation('_p & not(__p)'), cache=None, logic=logic) == (not four)
+
+
+@pytest.mark.parametrize('logic', ['K4', 'S4'])
+def test_transitive_logics_block_repeated_worlds(logic):
+    # every successor needs another one, the branch of successors only ends by blocking
+    verdict, stats = tableux_method(tableux_representation('_<>p&<>T'), cache=None, logic=logic, return_stats=True)
+    assert verdict is True and stats.blocked_worlds > 0
+
+
+
+### worker processes
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """solves the tasks in threads and records their arguments."""
+
+    def __init__(self):
+        super().__init__(2)
+        self.calls = []
+
+    def submit(self, function, *args):
+        self.calls.append(args)
+        return super().submit(function, *args)
+
+
+def test_tasks_get_the_engine_options():
+    executor = RecordingExecutor()
+    options = {'heuristic': 'moms', 'semantic': True, 'order_worlds': False, 'logic': 'KT'}
+    try:
+        for phi, _ in random_cases(5, 100):
+            assert tableux_method(tableux_representation(phi), cache=None, executor=executor, parallel_threshold=1, **options) == \
+                tableux_method(tableux_representation(phi), cache=None, **options), phi
+    finally:
+        executor.shutdown()
+    assert executor.calls
+    for labels, limits, task_options, run in executor.calls:
+        assert task_options['heuristic'] == 'moms' and task_options['semantic'] and not task_options['order_worlds']
+        assert task_options['logic'].name == 'KT'
+
+
+@pytest.mark.parametrize('options', [{}, {'heuristic': 'moms', 'semantic': True}, {'nogoods': tableux.NogoodStore(256)}],
+                         ids=['default', 'moms-semantic', 'nogoods'])
+def test_worker_pool_agrees_with_reference(options):
+    with tableux.WorkerPool(2) as executor:
+        for phi, expected in random_cases(6, 100):
+            assert tableux_method(tableux_representation(phi), cache=None, executor=executor, parallel_threshold=1, **options) == \
+                expected, phi
+
+
+
+### intern table
+
+def test_reset_formulas():
+    phi = tableux_representation('(p|q)&<>(not(p)&r)')
+    assert tableux_method(phi) is True
+    assert tableux.formula_count() > 2
+    tableux.reset_formulas()
+    assert tableux.formula_count() == 2 and len(tableux.world_cache) == 0
+    # parsed again into new nodes, the parse cache does not hand out the old ones
+    assert tableux_representation('(p|q)&<>(not(p)&r)') is not phi
+    assert tableux_method(tableux_representation('(p|q)&<>(not(p)&r)&_(q|not(p))')) is True
+    assert tableux_method(tableux_representation('<>(p&q)&_not(p)')) is False
+
+
+
+### command line
+
+def prompt(*args, formula):
+    """output of tableux.py with the arguments args when it prompts for the formula on a terminal."""
+    master, slave = pty.openpty()
+    script = os.path.join(os.path.dirname(__file__), 'tableux.py')
+    process = subprocess.Popen([sys.executable, script, *args], stdin=slave, stdout=subprocess.PIPE, text=True)
+    os.close(slave)
+    try:
+        os.write(master, formula.encode() + b'\n')
+        return process.communicate(timeout=60)[0]
+    finally:
+        os.close(master)
+
+
+def test_prompt_uses_the_options():
+    assert 'satisfiable: True' in prompt(formula='_p&not(p)')
+    output = prompt('--logic', 'KT', '--simplify', '--stats', '--engine', 'tableux', '--heuristic', 'moms', '--semantic',
+                    '--max-memory', '1000', '--nogoods', '64', '--cache-size', '0', formula='_p&not(p)&(q|(q&r))')
+    assert 'satisfiable: False' in output
+    assert 'simplification: 11 7' in output
+    assert json.loads(output.splitlines()[-1])['size_after'] == 7
+    assert 'unknown (max_nodes)' in prompt('--max-nodes', '0', formula='<>p')
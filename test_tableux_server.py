@@ -0,0 +1,88 @@
+"""tests of tableux_server.py, run with python -m pytest. the server runs in a thread of the test process, workers=0."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from tableux_server import TableuxClient, TableuxServer, check_request, client_request
+
+
+@pytest.fixture
+def server():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(TableuxServer(workers=0).start(port=0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def client(server):
+    host, port = server.address
+    with TableuxClient(host=host, port=port, timeout=30) as client:
+        yield client
+
+
+@pytest.mark.parametrize('request_', [{'timeout': 'x'}, {'timeout': -1}, {'timeout': float('nan')}, {'max_nodes': 1.5},
+                                      {'max_nodes': True}, {'preprocess': 1}, {'heuristic': 'best'}, {'engine': 'z3'},
+                                      {'logic': 'S5'}])
+def test_check_request_rejects(request_):
+    with pytest.raises((TypeError, ValueError)):
+        check_request(dict(request_, formula='p'))
+
+
+def test_check_request_accepts():
+    check_request({'formula': 'p', 'timeout': 0.5, 'max_nodes': 0, 'preprocess': True, 'stats': False, 'logic': 'S4'})
+
+
+def test_bad_request_keeps_connection(client):
+    # pipelined, the error reply of request 1 must not cost the replies of its neighbours
+    client.send({'id': 0, 'formula': 'p&q'})
+    client.send({'id': 1, 'formula': 'p', 'timeout': 'x'})
+    client.send({'id': 2, 'formula': 'p&not(p)', 'max_nodes': -3})
+    client.send({'id': 3, 'formula': 'p&not(p)'})
+    replies = [client.receive() for _ in range(4)]
+    assert [reply['id'] for reply in replies] == [0, 1, 2, 3]
+    assert replies[0]['satisfiable'] is True
+    assert replies[1]['error'] == 'TypeError'
+    assert replies[2]['error'] == 'ValueError'
+    assert replies[3]['satisfiable'] is False
+    assert client.stats()['verdicts']['error'] == 2
+
+
+def test_syntax_error_reply(client):
+    reply = client.solve('p&(q', id='a')
+    assert reply['id'] == 'a' and reply['error'] == 'FormulaSyntaxError'
+    assert client.request({'op': 'ping'}) == {'ok': True}
+
+
+def test_client_request():
+    assert client_request(3, '_p&not(p)', {'timeout': 1}) == {'id': 3, 'formula': '_p&not(p)', 'timeout': 1}
+    assert client_request(3, '{"formula": "_p&not(p)", "logic": "KT", "timeout": 2}', {'timeout': 1}) == \
+        {'id': 3, 'formula': '_p&not(p)', 'logic': 'KT', 'timeout': 2}
+    assert client_request(3, ' {"op": "stats"}', {'timeout': 1}) == {'op': 'stats'}
+    with pytest.raises(ValueError):
+        client_request(3, '{"formula": ', {})
+
+
+def test_client_sends_json_lines(server):
+    lines = ['_p&not(p)', '{"formula": "_p&not(p)", "logic": "KT", "id": "t"}', '{"op": "ping"}', '{"formula"']
+    host, port = server.address
+    script = os.path.join(os.path.dirname(__file__), 'tableux_server.py')
+    process = subprocess.run([sys.executable, script, 'client', '--host', host, '--port', str(port)],
+                             input='\n'.join(lines) + '\n', capture_output=True, text=True, timeout=60)
+    replies = [json.loads(line) for line in process.stdout.splitlines()]
+    assert replies[0]['id'] == 1 and replies[0]['satisfiable'] is True
+    assert replies[1]['id'] == 't' and replies[1]['satisfiable'] is False
+    assert replies[2] == {'ok': True}
+    assert replies[3]['id'] == 4 and replies[3]['error'] == 'JSONDecodeError'
+    assert process.returncode == 1